@@ -1,37 +1,74 @@
 from functools import lru_cache
 import json
-import requests
+import math
+import re
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from colorama import Fore, Style, init
 import os
 from dotenv import load_dotenv
 from .cache_manager import CacheManager
-from .config import CACHE_CONFIG
+from .session_manager import SessionManager
+from .rate_limiter import get_rate_limiter
+from .offline import OfflineReport
+from .config import CACHE_CONFIG, RATE_LIMIT_DELAY, PAGINATION_CONFIG
 import logging
 
 class FreshServiceAPI:
-    def __init__(self):
+    def __init__(self, session_manager=None):
         init(autoreset=True)
         load_dotenv()
         self.subdomain = os.getenv('FRESHSERVICE_SUBDOMAIN')
         self.api_key = os.getenv('FRESHSERVICE_API_KEY')
         self.base_url = f'https://{self.subdomain}.freshservice.com/api/v2/'
-        self.request_counter = 0
         self.cache = CacheManager()
+        # Limitador compartido por todos los hilos que usan la misma API key
+        self.rate_limiter = get_rate_limiter(self.api_key)
+        # Sesión HTTP con pool de conexiones compartida por todos los managers
+        self.session_manager = session_manager or SessionManager(auth=(self.api_key, ''))
+        # Modo offline: responder solo desde la caché (y el espejo local) sin tocar la red
+        self.offline = False
+        self.offline_report = OfflineReport()
         self.logger = logging.getLogger(__name__)
 
+    @property
+    def request_counter(self):
+        """Number of requests sent through the rate limiter"""
+        return self.rate_limiter.stats['requests']
+
     def handle_rate_limit(self, response):
-        """Handle API rate limiting"""
+        """Handle API rate limiting with a global pause shared by all threads"""
         if response.status_code == 429:
-            wait_time = int(response.headers.get('Retry-After', 60))
-            print(f"{Fore.YELLOW}Rate limit reached. Waiting {wait_time} seconds...{Style.RESET_ALL}")
-            time.sleep(wait_time)
-            self.request_counter = 0
+            wait_time = int(response.headers.get('Retry-After', RATE_LIMIT_DELAY))
+            if self.rate_limiter.pause(wait_time):
+                print(f"{Fore.YELLOW}Rate limit reached. Pausing requests for {wait_time} seconds...{Style.RESET_ALL}")
             return True
         return False
 
+    def set_offline(self, enabled=True):
+        """Enable or disable offline mode and reset the missing/stale report"""
+        self.offline = enabled
+        self.offline_report.reset()
+
+    def _offline_response(self, endpoint):
+        """Answer a request from the cache whatever its age, recording missing or stale data"""
+        endpoint = endpoint.lstrip('/')
+        entry = self.cache.peek(endpoint, cache_type=endpoint.split('/')[0] or 'general')
+        if entry is None:
+            self.offline_report.record(endpoint, 'missing')
+            return None
+        self.offline_report.record(endpoint, 'served' if entry['fresh'] else 'stale')
+        return entry['data']
+
+    def get_rate_limit_budget(self):
+        """Get the current rate limit budget"""
+        return self.rate_limiter.get_budget()
+
     def get_cached_request(self, endpoint):
         """Get cached request or make new one"""
+        if self.offline:
+            return self._offline_response(endpoint)
         try:
             # Determinar el tipo de caché basado en el endpoint
             endpoint_parts = endpoint.split('/')
@@ -45,19 +82,24 @@ class FreshServiceAPI:
                 return self.make_request(endpoint)
             
             # Intentar obtener de la caché
-            cached_data = self.cache.get(endpoint, cache_type=cache_type)
-            if cached_data is not None:
-                logging.info(f"Cache hit for {endpoint}")
-                return cached_data
+            entry = self.cache.lookup(endpoint, cache_type=cache_type)
+            if entry is not None:
+                if entry['fresh']:
+                    logging.info(f"Cache hit for {endpoint}")
+                    return entry['data']
+                if CACHE_CONFIG.get('stale_while_revalidate'):
+                    # Servir la entrada caducada ya y refrescarla sin bloquear al llamante
+                    logging.info(f"Stale cache hit for {endpoint}, refreshing in background")
+                    self.cache.refresh_in_background(
+                        endpoint, cache_type, lambda: self._fetch_for_cache(endpoint, cache_type, entry)
+                    )
+                    return entry['data']
             
-            # Si no está en caché, hacer la petición
+            # Si no está en caché (o está caducada), hacer la petición
             logging.debug(f"Cache miss for {endpoint}, making request")
-            data = self.make_request(endpoint, max_retries=3)  # Añadimos max_retries
+            data = self._fetch_for_cache(endpoint, cache_type, entry)
             
-            # Guardar en caché solo si la petición fue exitosa
             if data is not None:
-                logging.debug(f"Caching response for {endpoint}")
-                self.cache.set(endpoint, data, cache_type=cache_type)
                 return data
             else:
                 logging.warning(f"No se pudo obtener datos para {endpoint} después de reintentos")
@@ -68,27 +110,71 @@ class FreshServiceAPI:
             # Intentamos con reintentos en caso de error
             return self.make_request(endpoint, max_retries=3)
 
+    def _fetch_for_cache(self, endpoint, cache_type, entry=None):
+        """Fetch an endpoint into the cache, revalidating `entry` with a conditional GET when possible"""
+        headers = self.cache.get_conditional_headers(entry)
+        response = self._send_request(endpoint, headers=headers, max_retries=3)
+        if response is None:
+            return None
+
+        if headers:
+            self.cache.record_revalidation(cache_type, response.status_code == 304)
+        if response.status_code == 304:
+            # Sin cambios: reiniciar el TTL sin descargar ni parsear el cuerpo
+            logging.debug(f"Not modified: {endpoint}")
+            self.cache.touch(endpoint, cache_type)
+            return entry['data']
+
+        if response.status_code != 200:
+            logging.getLogger(__name__).error(f"Error response: {response.text}")
+            return None
+
+        data = response.json()
+        logging.debug(f"Caching response for {endpoint}")
+        self.cache.set(endpoint, data, cache_type=cache_type, validators=self.cache.get_validators(response.headers))
+        return data
+
     def make_request(self, endpoint, method='GET', params=None, data=None, max_retries=3):
         """Make API request with simplified logging"""
+        if self.offline:
+            return self._offline_response(endpoint) if method == 'GET' else None
+        response = self._send_request(endpoint, method, params, data, max_retries)
+        if response is None:
+            return None
+
+        if response.status_code != 200:
+            logging.getLogger(__name__).error(f"Error response: {response.text}")
+            return None
+
+        return response.json()
+
+    def _send_request(self, endpoint, method='GET', params=None, data=None, max_retries=3, headers=None):
+        """Send API request handling rate limits and retries; returns the raw response"""
         endpoint = endpoint.lstrip('/')
         url = f'{self.base_url}{endpoint}'
         
         logger = logging.getLogger(__name__)
+        if self.offline:
+            # Nunca tocar la red en modo offline
+            self.offline_report.record(endpoint, 'missing')
+            return None
         logger.info(f"API Request: {method} {url}")
         
         retries = 0
         while retries <= max_retries:
             try:
-                response = requests.request(
+                # Esperar turno en el token bucket (y en pausas globales por 429)
+                self.rate_limiter.acquire()
+                response = self.session_manager.request(
                     method,
                     url,
-                    auth=(self.api_key, ''),
                     params=params,
                     json=data,
-                    timeout=30
+                    headers=headers
                 )
                 
                 logger.info(f"Response status: {response.status_code}")
+                self.rate_limiter.update_from_response(response)
                 
                 # Verificar rate limit
                 if response.status_code == 429:
@@ -96,12 +182,8 @@ class FreshServiceAPI:
                         retries += 1
                         logger.warning(f"Rate limit alcanzado. Reintento {retries}/{max_retries}")
                         continue
-                
-                if response.status_code != 200:
-                    logger.error(f"Error response: {response.text}")
-                    return None
                     
-                return response.json()
+                return response
                 
             except Exception as e:
                 logger.error(f"Request failed: {str(e)}")
@@ -114,79 +196,205 @@ class FreshServiceAPI:
         
         return None
 
-    def fetch_all_pages(self, endpoint, key):
-        page = 1
-        all_data = []
-        max_retries = 3
-        retry_count = 0
-        
-        while True:
-            current_endpoint = f"{endpoint}?page={page}"
-            data = self.make_request(current_endpoint, max_retries=max_retries)
-            
-            if not data:
-                # Si no hay datos y aún tenemos reintentos, intentamos nuevamente
-                retry_count += 1
-                if retry_count <= max_retries:
-                    logging.warning(f"Error al obtener página {page}, reintentando ({retry_count}/{max_retries})...")
-                    time.sleep(5)  # Esperar antes de reintentar
-                    continue
-                else:
-                    logging.error(f"No se pudo obtener datos para la página {page} después de {max_retries} intentos")
-                    break
-            
-            # Resetear contador de reintentos si tuvimos éxito
-            retry_count = 0
-            
-            if key not in data or not data[key]:
-                break
-                
-            all_data.extend(data[key])
-            page += 1
-            logging.info(f"Obtenida página {page-1} con {len(data[key])} elementos")
-            
-        return all_data
+    def fetch_all_pages(self, endpoint, key, parallel=None):
+        """Fetch all pages of an endpoint, extracting `key` from each page"""
+        return self._fetch_pages(endpoint, key, parallel)
 
-    def fetch_paginated_data(self, endpoint, query=''):
+    def fetch_paginated_data(self, endpoint, query='', parallel=None):
         """Fetch all paginated data from an endpoint"""
-        all_data = []
-        page = 1
-        max_retries = 3
+        return self._fetch_pages(f'{endpoint}{query}', self._get_data_key(endpoint), parallel)
+
+    def iter_pages(self, endpoint, query='', key=None, read_ahead=None):
+        """Yield the records of each page as it arrives, prefetching up to `read_ahead` pages"""
+        if read_ahead is None:
+            read_ahead = PAGINATION_CONFIG['read_ahead']
+        yield from self._iter_page_items(
+            f'{endpoint}{query}',
+            key or self._get_data_key(endpoint),
+            PAGINATION_CONFIG['per_page'],
+            read_ahead=read_ahead
+        )
+
+    def iter_items(self, endpoint, query='', key=None, read_ahead=None):
+        """Yield records one by one as their pages arrive"""
+        for items in self.iter_pages(endpoint, query, key, read_ahead):
+            yield from items
+
+    def _get_data_key(self, endpoint):
+        """Get the response key for an endpoint (assets, departments, locations, etc.)"""
+        return endpoint.split('?')[0].split('/')[0]
+
+    def _page_endpoint(self, base, page, per_page=None):
+        """Build the endpoint for a given page"""
+        separator = '&' if '?' in base else '?'
+        endpoint = f'{base}{separator}page={page}'
+        if per_page:
+            endpoint += f'&per_page={per_page}'
+        return endpoint
+
+    def _fetch_page(self, base, page, per_page=None, max_retries=3):
+        """Fetch a single page, retrying when no data is returned; returns (data, response)"""
+        if self.offline:
+            # Sin red no tiene sentido reintentar: los listados salen de las instantáneas
+            return None, None
         retry_count = 0
-        
         while True:
-            separator = '&' if '?' in query else '?'
-            current_endpoint = f'{endpoint}{query}{separator}page={page}'
-            
-            # Usar max_retries para manejar rate limits
-            data = self.make_request(current_endpoint, max_retries=max_retries)
-            
-            if not data:
-                # Si no hay datos y aún tenemos reintentos, intentamos nuevamente
-                retry_count += 1
-                if retry_count <= max_retries:
-                    logging.warning(f"Error al obtener página {page}, reintentando ({retry_count}/{max_retries})...")
-                    time.sleep(5)  # Esperar antes de reintentar
-                    continue
-                else:
-                    logging.error(f"No se pudo obtener datos para la página {page} después de {max_retries} intentos")
-                    break
-            
-            # Resetear contador de reintentos si tuvimos éxito
-            retry_count = 0
-                
-            # Extract data based on endpoint type
-            key = endpoint.split('/')[0]  # assets, departments, locations, etc.
-            if key in data and data[key]:
-                all_data.extend(data[key])
-                page += 1
-                logging.info(f"Obtenida página {page-1} con {len(data[key])} elementos")
-            else:
-                logging.info(f"No hay más datos en la página {page}")
-                break
-                
+            response = self._send_request(self._page_endpoint(base, page, per_page), max_retries=max_retries)
+            if response is not None and response.status_code == 200:
+                return response.json(), response
+            if response is not None:
+                logging.error(f"Error response: {response.text}")
+
+            # Si no hay datos y aún tenemos reintentos, intentamos nuevamente
+            retry_count += 1
+            if retry_count > max_retries:
+                logging.error(f"No se pudo obtener datos para la página {page} después de {max_retries} intentos")
+                return None, response
+            logging.warning(f"Error al obtener página {page}, reintentando ({retry_count}/{max_retries})...")
+            time.sleep(5)  # Esperar antes de reintentar
+
+    def _get_last_page(self, response, data, per_page):
+        """Learn the number of pages from the first response (Link header or total count)"""
+        last_link = response.links.get('last', {}).get('url')
+        if last_link:
+            match = re.search(r'[?&]page=(\d+)', last_link)
+            if match:
+                return int(match.group(1))
+
+        total = response.headers.get('X-Total-Count')
+        if total is None and isinstance(data, dict):
+            total = data.get('total') or (data.get('meta') or {}).get('count')
+        try:
+            return math.ceil(int(total) / per_page) if total is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    def _snapshot_key(self, base):
+        """Cache key of the full listing of an unfiltered endpoint ('locations' -> 'locations/all'), None if filtered"""
+        base = base.strip('/')
+        if '?' in base or base.split('/')[0] in CACHE_CONFIG.get('excluded_endpoints', []):
+            return None
+        return f'{base}/all'
+
+    def _offline_items(self, base):
+        """Answer a listing offline from its snapshot; filtered listings have none and count as missing"""
+        snapshot_key = self._snapshot_key(base)
+        if snapshot_key is None:
+            self.offline_report.record(base, 'missing')
+            return []
+        return self._offline_response(snapshot_key) or []
+
+    def _fetch_pages(self, base, key, parallel=None):
+        """Fetch every page of `base`, keeping a snapshot of unfiltered listings for offline runs"""
+        if self.offline:
+            return self._offline_items(base)
+
+        records = self._download_pages(base, key, parallel)
+        snapshot_key = self._snapshot_key(base)
+        if records and snapshot_key:
+            self.cache.set(snapshot_key, records, cache_type=snapshot_key.split('/')[0])
+        return records
+
+    def _download_pages(self, base, key, parallel=None):
+        """Download every page of `base`, concurrently when the page count can be learned"""
+        if parallel is None:
+            parallel = PAGINATION_CONFIG['parallel']
+        if not parallel:
+            return [item for items in self._iter_page_items(base, key) for item in items]
+
+        per_page = PAGINATION_CONFIG['per_page']
+        data, response = self._fetch_page(base, 1, per_page)
+        first_items = (data or {}).get(key) or []
+        if not first_items:
+            logging.info("No hay más datos en la página 1")
+            return []
+
+        all_data = list(first_items)
+        logging.info(f"Obtenida página 1 con {len(first_items)} elementos")
+        # Una primera página incompleta es la única (colecciones pequeñas como departamentos)
+        if len(first_items) < per_page:
+            return all_data
+
+        last_page = self._get_last_page(response, data, per_page)
+        if last_page is not None:
+            for items in self._fetch_page_range(base, key, 2, last_page + 1, per_page):
+                all_data.extend(items)
+            return all_data
+
+        # Sin número de páginas: ventanas de páginas en paralelo o serie como alternativa
+        read_ahead = PAGINATION_CONFIG['max_workers'] if PAGINATION_CONFIG['speculative'] else 0
+        for items in self._iter_page_items(base, key, per_page, start_page=2,
+                                           read_ahead=read_ahead, page_size=len(first_items)):
+            all_data.extend(items)
         return all_data
 
+    def _fetch_page_range(self, base, key, start, stop, per_page):
+        """Fetch pages [start, stop) concurrently and return their items in page order"""
+        if start >= stop:
+            return []
+        workers = min(PAGINATION_CONFIG['max_workers'], stop - start)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='page-fetch') as executor:
+            results = list(executor.map(lambda page: self._fetch_page(base, page, per_page)[0], range(start, stop)))
+
+        pages = []
+        for page, data in zip(range(start, stop), results):
+            items = (data or {}).get(key) or []
+            logging.info(f"Obtenida página {page} con {len(items)} elementos")
+            pages.append(items)
+        return pages
+
+    def _iter_page_items(self, base, key, per_page=None, start_page=1, read_ahead=0, page_size=0):
+        """Yield the items of each page in order until an empty or short page is found"""
+        if self.offline:
+            items = self._offline_items(base)
+            if items:
+                yield items
+            return
+
+        executor = None
+        pending = deque()
+        next_page = start_page
+        if read_ahead > 0:
+            executor = ThreadPoolExecutor(max_workers=read_ahead, thread_name_prefix='page-read-ahead')
+
+        try:
+            while True:
+                if executor:
+                    # Mantener `read_ahead` páginas en vuelo mientras se consume la actual
+                    while len(pending) < read_ahead:
+                        pending.append((next_page, executor.submit(self._fetch_page, base, next_page, per_page)))
+                        next_page += 1
+                    page, future = pending.popleft()
+                    data, _ = future.result()
+                else:
+                    page = next_page
+                    next_page += 1
+                    data, _ = self._fetch_page(base, page, per_page)
+
+                items = (data or {}).get(key) or []
+                if not items:
+                    logging.info(f"No hay más datos en la página {page}")
+                    return
+
+                logging.info(f"Obtenida página {page} con {len(items)} elementos")
+                yield items
+
+                # Una página más corta que las anteriores es la última
+                page_size = max(page_size, len(items))
+                if len(items) < page_size:
+                    return
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+
     def get_cached_data(self, url):
         """Get cached data from API"""
         return self.get_cached_request(url)
+
+    def get_cache_stats(self):
+        """Get cache hit/miss counters per cache_type"""
+        return self.cache.get_stats()
+
+    def get_connection_stats(self):
+        """Get connection pool reuse statistics"""
+        return self.session_manager.get_stats()
@@ -1,3 +1,4 @@
+import re
 import requests
 from .api import FreshServiceAPI
 from .component_manager import ComponentManager
@@ -5,13 +6,23 @@ from .managers.location_manager import LocationManager
 from .managers.user_manager import UserManager
 from .managers.department_manager import DepartmentManager
 from .excel_manager import ExcelManager
+from .data_processor import render_table
+from .reference_data import ReferenceDataRegistry
+from .id_set import IdRangeSet, iter_id_tokens
+from .asset_mirror import AssetMirror
+from .pipeline import iter_pipeline
+from .run_journal import RunJournal
 import pandas as pd
 from tqdm import tqdm
 import os
 from colorama import Fore, Style, init
 import logging
 import time
-from freshservice.config import DEFAULT_COLUMNS
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from freshservice.config import DEFAULT_COLUMNS, CONCURRENCY_CONFIG, ASSET_TYPE_FIELDS, ASYNC_CONFIG, EXISTENCE_CONFIG, PIPELINE_CONFIG, PAGINATION_CONFIG
 
 logger = logging.getLogger(__name__)
 
@@ -24,89 +35,113 @@ class AssetManager(FreshServiceAPI):
         self.user_manager = UserManager(self)
         self.department_manager = DepartmentManager(self)
         self.excel_manager = ExcelManager()
+        self.reference_data = ReferenceDataRegistry(self)
+        self.mirror = AssetMirror()
+        self._existing_ids = None
+        self._existing_ids_at = 0
+
+    def get_asset(self, asset_id, include=None):
+        """Get asset data by ID, optionally with include=... payloads"""
+        # IDs que no existían hace poco: no gastar peticiones en rangos dispersos
+        if self.cache.is_negative(f'assets/{asset_id}', 'assets'):
+            logger.debug(f"Asset {asset_id} skipped (negative cache)")
+            return None
 
-    def get_asset(self, asset_id):
-        """Get asset data by ID"""
-        response = self.make_request(f'assets/{asset_id}')
-        return response.get('asset') if response else None
+        if self.offline:
+            response = self._offline_response(f'assets/{asset_id}')
+            return response.get('asset') if response else None
+
+        # El espejo local guarda los assets con type_fields: sirve cualquier include
+        if self.mirror.is_fresh():
+            asset = self.mirror.get_asset(asset_id)
+            if asset:
+                return asset
+
+        endpoint = f'assets/{asset_id}'
+        if include:
+            endpoint += f"?include={','.join(include)}"
+        response = self._send_request(endpoint)
+        if response is None:
+            return None
+        if response.status_code == 404:
+            self.cache.set_negative(f'assets/{asset_id}', 'assets')
+            return None
+        if response.status_code != 200:
+            logger.error(f"Error response: {response.text}")
+            return None
+        return response.json().get('asset')
 
     def get_departments(self):
         """Get all departments using correct API URL and handling"""
         try:
-            data = self.make_request('departments')
-            if data and 'departments' in data:
-                return {dept['id']: dept['name'] for dept in data['departments']}
-            return {}
+            return self.reference_data.get_names('departments')
         except Exception as e:
             print(f"{Fore.RED}Error getting departments: {e}")
             return {}
 
     def get_locations(self):
         """Get all locations with proper API URL"""
-        url = f'https://{self.subdomain}.freshservice.com/api/v2/locations/'
-        data = self.fetch_paginated_data('locations')
-        return {loc['id']: loc['name'] for loc in data} if data else {}
+        return self.reference_data.get_names('locations')
 
     def get_all_locations(self):
         """Get all locations with complete data"""
-        locations = self.fetch_paginated_data('locations')
+        locations = self.reference_data.get_records('locations')
         return sorted(locations, key=lambda x: x.get('name', '')) if locations else []
 
     def process_asset_ids(self, ids_input, exclude_input=None):
-        """Process asset IDs from input"""
-        ids = []
+        """Process asset IDs from input (string, txt or Excel file) into an IdRangeSet"""
+        invalid = []
         if os.path.isfile(ids_input):
             if ids_input.endswith('.xlsx') or ids_input.endswith('.xls'):
                 # Leer Excel y tomar primera columna
                 try:
-                    df = pd.read_excel(ids_input)
-                    if not df.empty:
-                        # Convertir primera columna a números y eliminar duplicados
-                        numbers = pd.to_numeric(df.iloc[:, 0], errors='coerce')
-                        ids = sorted(set([int(x) for x in numbers.dropna()]))
+                    df = pd.read_excel(ids_input, usecols=[0])
+                    numbers = pd.to_numeric(df.iloc[:, 0], errors='coerce').dropna() if not df.empty else []
+                    ids = IdRangeSet.from_ids(int(x) for x in numbers)
                 except Exception as e:
                     print(f"{Fore.RED}Error reading Excel file: {e}")
-                    return []
+                    return IdRangeSet()
             else:
-                # Mantener lógica existente para archivos txt
+                # Los txt se leen por bloques: los rangos no se expanden nunca
                 with open(ids_input, 'r') as file:
-                    ids = file.read().strip().split(',')
+                    ids = IdRangeSet.from_tokens(iter_id_tokens(file), invalid)
         else:
-            ids = ids_input.split(',')
+            ids = IdRangeSet.parse(ids_input, invalid)
 
-        expanded_ids = []
-        for id_part in ids:
-            id_part = str(id_part).strip()
-            if '-' in id_part:
-                try:
-                    start, end = map(int, id_part.split('-'))
-                    expanded_ids.extend(range(start, end + 1))
-                except ValueError:
-                    print(f"{Fore.RED}Error: Invalid range '{id_part}'. Skipping.")
-            elif str(id_part).replace('.0', '').isdigit():  # Manejar números con .0 desde Excel
-                expanded_ids.append(int(float(id_part)))
-            elif id_part.isdigit():
-                expanded_ids.append(int(id_part))
+        for token in invalid:
+            if '-' in token:
+                print(f"{Fore.RED}Error: Invalid range '{token}'. Skipping.")
             else:
-                print(f"{Fore.RED}Error: Invalid ID '{id_part}'. Skipping.")
-
-        # Eliminar duplicados y ordenar
-        expanded_ids = sorted(set(expanded_ids))
+                print(f"{Fore.RED}Error: Invalid ID '{token}'. Skipping.")
 
         if exclude_input:
-            exclude_ids = self.process_asset_ids(exclude_input)
-            expanded_ids = [id_ for id_ in expanded_ids if id_ not in exclude_ids]
+            ids = ids - self.process_asset_ids(exclude_input)
+
+        return ids
 
-        return expanded_ids
+    def process_assets(self, asset_ids, options, journal=None):
+        """Process multiple assets with options, checkpointing each one in the run journal if given"""
+        return list(self.iter_process_assets(asset_ids, options, journal))
 
-    def process_assets(self, asset_ids, options):
-        """Process multiple assets with options"""
+    def iter_process_assets(self, asset_ids, options, journal=None):
+        """Yield the result rows in input order as assets are processed (for streaming exporters)"""
+        asset_ids, skipped = self._skip_missing_ids(asset_ids)
+        if skipped:
+            preview = str(IdRangeSet(skipped.ranges[:10])) + ('...' if len(skipped.ranges) > 10 else '')
+            print(f"{Fore.YELLOW}Skipping {len(skipped)} IDs that don't exist: {preview}")
+            logger.info(f"Skipped non-existent IDs: {skipped}")
         total = len(asset_ids)
+        workers = self._get_worker_count(options)
+        # Offline no hay peticiones HTTP que solapar: el motor asyncio no aporta nada
+        async_concurrency = None if self.offline else self._get_async_concurrency(options)
+        read_ahead = 0 if self.offline or workers > 1 else self._get_read_ahead(options)
         start_time = time.time()
 
+        # Índices de referencia en memoria: el enriquecimiento pasa a ser búsquedas en diccionarios
+        self.reference_data.preload(self._plan_reference_data(options))
+
         # Configurar barra de progreso más visible y descriptiva
         progress_bar = tqdm(
-            asset_ids,
             desc=f"{Fore.CYAN}Processing assets{Style.RESET_ALL}",
             total=total,
             unit="asset",
@@ -116,41 +151,304 @@ class AssetManager(FreshServiceAPI):
         )
 
         times_per_asset = []
-        all_data = []
+        progress_lock = threading.Lock()
 
-        for asset_id in progress_bar:
-            asset_start = time.time()
-            
-            try:
-                asset_data = self._process_single_asset(asset_id, options)
-                if asset_data:
-                    all_data.extend(asset_data if isinstance(asset_data, list) else [asset_data])
-                
-                # Actualizar estadísticas
-                asset_time = time.time() - asset_start
+        def on_complete(asset_time):
+            # Se llama desde los workers al terminar cada asset (en cualquier orden)
+            with progress_lock:
                 times_per_asset.append(asset_time)
                 avg_time = sum(times_per_asset) / len(times_per_asset)
-                
-                # Actualizar descripción de la barra con más detalles
                 progress_bar.set_description(
                     f"{Fore.CYAN}Processing assets{Style.RESET_ALL} "
-                    f"(avg: {avg_time:.1f}s/asset)"
+                    f"(avg: {avg_time:.1f}s/asset)",
+                    refresh=False
                 )
-            
-            except Exception as e:
-                logger.error(f"Error processing asset {asset_id}: {str(e)}")
-                continue
+                progress_bar.update(1)
+
+        # Los resultados se reciben en el mismo orden que asset_ids
+        if async_concurrency:
+            processed = self._iter_processed_assets_async(asset_ids, options, async_concurrency, on_complete)
+        elif read_ahead:
+            processed = self._iter_pipelined_assets(asset_ids, options, read_ahead, on_complete)
+        else:
+            processed = self._iter_processed_assets(asset_ids, options, workers, on_complete)
+
+        try:
+            for asset_id, asset_data in processed:
+                if journal is not None:
+                    journal.record(asset_id, asset_data, self._get_result_status(asset_id, asset_data))
+                if asset_data:
+                    yield from asset_data if isinstance(asset_data, list) else [asset_data]
+        finally:
+            progress_bar.close()
 
         total_time = time.time() - start_time
         print(f"\n{Fore.GREEN}✓ Completed processing {total} assets in {total_time:.1f}s")
         
         if times_per_asset:
             print(f"{Fore.CYAN}Statistics:")
+            if async_concurrency:
+                print(f"  Async concurrency: {async_concurrency}")
+            elif workers > 1:
+                print(f"  Workers: {workers}")
+            elif read_ahead:
+                print(f"  Read-ahead: {read_ahead} assets")
             print(f"  Average time per asset: {sum(times_per_asset)/len(times_per_asset):.1f}s")
             print(f"  Fastest asset: {min(times_per_asset):.1f}s")
             print(f"  Slowest asset: {max(times_per_asset):.1f}s")
 
-        return all_data
+        connection_stats = self.get_connection_stats()
+        if connection_stats['requests']:
+            print(f"  Connections reused: {connection_stats['connections_reused']}/{connection_stats['requests']} "
+                  f"({connection_stats['reuse_ratio']:.0%})")
+        logger.info(f"Connection pool stats: {connection_stats}")
+
+        budget = self.get_rate_limit_budget()
+        if budget['throttled_waits'] or budget['rate_limit_hits']:
+            print(f"  Rate limit: {budget['throttled_waits']} paced waits ({budget['throttled_seconds']:.1f}s), "
+                  f"{budget['rate_limit_hits']} pauses after 429")
+        logger.info(f"Rate limit budget: {budget}")
+
+        cache_stats = self.get_cache_stats()
+        for cache_type, counters in cache_stats['by_type'].items():
+            print(f"  Cache {cache_type}: {counters['memory_hits']} memory hits, {counters['disk_hits']} disk hits, "
+                  f"{counters['stale_hits']} stale hits, {counters['misses']} misses")
+            if counters['revalidations']:
+                print(f"    {counters['not_modified']}/{counters['revalidations']} revalidations not modified "
+                      f"({counters['revalidation_ratio']:.0%})")
+        logger.info(f"Cache stats: {cache_stats}")
+
+    def _get_result_status(self, asset_id, asset_data):
+        """Journal status of a processed asset: only confirmed 404s (negative cache) count as not found"""
+        if asset_data:
+            return RunJournal.DONE
+        if self.cache.is_negative(f'assets/{asset_id}', 'assets'):
+            return RunJournal.NOT_FOUND
+        return RunJournal.FAILED
+
+    def _offline_response(self, endpoint):
+        """Answer assets/{id} and assets/{id}/components from the mirror, anything else from the cache"""
+        match = re.fullmatch(r'assets/(\d+)(/components)?', endpoint.split('?')[0].strip('/'))
+        if match and self.mirror.get_last_sync() is not None:
+            asset_id = match.group(1)
+            if match.group(2):
+                data = self.mirror.get_components(asset_id)
+            else:
+                asset = self.mirror.get_asset(asset_id)
+                data = {'asset': asset} if asset else None
+            if data is not None:
+                self.offline_report.record(endpoint, 'served' if self.mirror.is_fresh() else 'stale')
+                return data
+        return super()._offline_response(endpoint)
+
+    def _use_mirror(self):
+        """Whether searches should read the local mirror (fresh, or of any age when offline)"""
+        if self.mirror.is_fresh():
+            return True
+        if self.offline and self.mirror.get_last_sync() is not None:
+            self.offline_report.record('assets', 'stale')
+            return True
+        return False
+
+    def get_existing_ids(self, max_pages=None, up_to=None):
+        """Get the display_ids that exist (local mirror or paginated listing); None if the listing needs more than max_pages requests"""
+        if self._use_mirror():
+            return IdRangeSet.from_ids(self.mirror.iter_display_ids())
+        if self.offline:
+            return None
+
+        # El listado guardado solo se reutiliza si llega hasta el ID más alto pedido
+        cached = self._existing_ids
+        if (cached is None or time.time() - self._existing_ids_at > EXISTENCE_CONFIG['max_age_seconds']
+                or (up_to is not None and cached.last < up_to)):
+            started_at = time.time()
+            existing = self._list_existing_ids(max_pages)
+            if not existing:
+                # Listado vacío, fallido o demasiado caro: mejor no descartar nada
+                return None
+            logger.info(f"Listed {len(existing)} existing assets in {time.time() - started_at:.1f}s")
+            self._existing_ids = existing
+            self._existing_ids_at = time.time()
+        return self._existing_ids
+
+    def _list_existing_ids(self, max_pages=None):
+        """List the existing display_ids page by page, stopping once the listing would exceed max_pages"""
+        per_page = PAGINATION_CONFIG['per_page']
+        data, response = self._fetch_page('assets', 1, per_page)
+        first_items = (data or {}).get('assets') or []
+        if not first_items:
+            return None
+        display_ids = [asset['display_id'] for asset in first_items]
+        if len(first_items) < per_page:
+            return IdRangeSet.from_ids(display_ids)
+
+        # Con el número de páginas se decide antes de gastar nada más
+        last_page = self._get_last_page(response, data, per_page)
+        if last_page is not None:
+            if max_pages is not None and last_page > max_pages:
+                logger.info(f"Existence pre-pass skipped: listing needs {last_page} pages, budget is {max_pages}")
+                return None
+            for items in self._fetch_page_range('assets', 'assets', 2, last_page + 1, per_page):
+                display_ids.extend(asset['display_id'] for asset in items)
+            return IdRangeSet.from_ids(display_ids)
+
+        # Sin número de páginas: abandonar al agotar el presupuesto (lo gastado queda acotado)
+        pages = 1
+        for items in self._iter_page_items('assets', 'assets', per_page, start_page=2,
+                                           read_ahead=PAGINATION_CONFIG['read_ahead'], page_size=len(first_items)):
+            pages += 1
+            if max_pages is not None and pages > max_pages:
+                logger.info(f"Existence pre-pass abandoned after {max_pages} pages")
+                return None
+            display_ids.extend(asset['display_id'] for asset in items)
+        return IdRangeSet.from_ids(display_ids)
+
+    def _skip_missing_ids(self, asset_ids):
+        """Drop the IDs that don't exist before the per-asset fetches; returns (ids, skipped)"""
+        if not EXISTENCE_CONFIG['enabled'] or len(asset_ids) < EXISTENCE_CONFIG['min_ids']:
+            return asset_ids, None
+        # El listado solo compensa si cuesta bastante menos que pedir los IDs uno a uno
+        max_pages = max(1, int(len(asset_ids) * EXISTENCE_CONFIG['max_listing_ratio']))
+        up_to = asset_ids.last if isinstance(asset_ids, IdRangeSet) else max(asset_ids, default=None)
+        existing = self.get_existing_ids(max_pages, up_to)
+        if not existing:
+            return asset_ids, None
+
+        # Los display_id son crecientes y no se reutilizan: solo los huecos por debajo del más alto
+        # conocido son bajas seguras; lo de encima puede haberse creado después y se pide uno a uno
+        missing = IdRangeSet([(0, existing.last)]) - existing
+        if isinstance(asset_ids, IdRangeSet):
+            return asset_ids - missing, asset_ids & missing
+        # Listas explícitas: conservar el orden de entrada
+        kept = [asset_id for asset_id in asset_ids if asset_id not in missing]
+        skipped = IdRangeSet.from_ids(asset_id for asset_id in asset_ids if asset_id in missing)
+        return kept, skipped
+
+    def _plan_reference_data(self, options):
+        """Work out which reference collections the selected options need"""
+        collections = ['asset_types']
+        if options.get('include_departments'):
+            collections.append('departments')
+        if options.get('include_location'):
+            collections.append('locations')
+        return collections
+
+    def _get_worker_count(self, options):
+        """Get bounded number of workers from options"""
+        try:
+            workers = int(options.get('workers') or CONCURRENCY_CONFIG['default_workers'])
+        except (TypeError, ValueError):
+            workers = CONCURRENCY_CONFIG['default_workers']
+        return max(1, min(workers, CONCURRENCY_CONFIG['max_workers']))
+
+    def _get_read_ahead(self, options):
+        """Get how many assets the sequential pipeline prefetches (0 = no pipeline)"""
+        read_ahead = options.get('read_ahead')
+        if read_ahead is None:
+            read_ahead = PIPELINE_CONFIG['read_ahead']
+        try:
+            return max(0, int(read_ahead))
+        except (TypeError, ValueError):
+            return PIPELINE_CONFIG['read_ahead']
+
+    def _get_async_concurrency(self, options):
+        """Get asyncio concurrency from options (None = use the thread engine)"""
+        concurrency = options.get('async_concurrency')
+        if not concurrency and ASYNC_CONFIG['enabled']:
+            concurrency = ASYNC_CONFIG['max_concurrency']
+        return max(1, int(concurrency)) if concurrency else None
+
+    def _iter_processed_assets_async(self, asset_ids, options, concurrency, on_complete=None):
+        """Yield (asset_id, data) in input order using AsyncFreshServiceAPI"""
+        # Importación diferida: aiohttp solo es necesario para el motor asyncio
+        from .async_api import iter_process_assets_sync
+        return iter_process_assets_sync(
+            self, asset_ids, options, self._build_asset_result,
+            max_concurrency=concurrency, on_complete=on_complete
+        )
+
+    def _timed_process_single_asset(self, asset_id, options):
+        """Process single asset and measure the elapsed time"""
+        asset_start = time.time()
+        try:
+            asset_data = self._process_single_asset(asset_id, options)
+        except Exception as e:
+            logger.error(f"Error processing asset {asset_id}: {str(e)}")
+            asset_data = None
+        return asset_data, time.time() - asset_start
+
+    def _iter_processed_assets(self, asset_ids, options, workers=1, on_complete=None):
+        """Yield (asset_id, data) in input order, processing up to `workers` assets at once"""
+        if workers <= 1:
+            for asset_id in asset_ids:
+                asset_data, asset_time = self._timed_process_single_asset(asset_id, options)
+                if on_complete:
+                    on_complete(asset_time)
+                yield asset_id, asset_data
+            return
+
+        # Ventana acotada de tareas en vuelo para no encolar todos los IDs a la vez
+        max_pending = workers * 2
+        ids_iter = iter(asset_ids)
+        pending = deque()
+
+        def submit(executor, asset_id):
+            future = executor.submit(self._timed_process_single_asset, asset_id, options)
+            if on_complete:
+                future.add_done_callback(lambda f: on_complete(f.result()[1]))
+            pending.append((asset_id, future))
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='asset-worker') as executor:
+            for asset_id in islice(ids_iter, max_pending):
+                submit(executor, asset_id)
+
+            while pending:
+                asset_id, future = pending.popleft()
+                asset_data, _ = future.result()
+                next_id = next(ids_iter, None)
+                if next_id is not None:
+                    submit(executor, next_id)
+                yield asset_id, asset_data
+
+    def _iter_pipelined_assets(self, asset_ids, options, read_ahead, on_complete=None):
+        """Yield (asset_id, data) in input order while the next `read_ahead` assets are being fetched"""
+        includes = self._plan_asset_includes(options)
+
+        def fetch_asset(asset_id):
+            started_at = time.time()
+            try:
+                asset = self.get_asset(asset_id, include=includes)
+            except Exception as e:
+                logger.error(f"Error fetching asset {asset_id}: {str(e)}")
+                asset = None
+            return asset_id, {'asset': asset}, started_at
+
+        def fetch_related(item):
+            asset_id, bundle, _ = item
+            asset = bundle['asset']
+            if not asset:
+                return item
+            try:
+                if options.get('components'):
+                    bundle['components'] = self._fetch_components(asset_id)
+                if options.get('include_user') and asset.get('user_id'):
+                    # Calienta la caché: _get_user_info la encontrará en memoria
+                    self.get_cached_request(f'requesters/{asset["user_id"]}')
+            except Exception as e:
+                logger.error(f"Error prefetching data of asset {asset_id}: {str(e)}")
+            return item
+
+        # Etapas: asset base -> componentes y usuario -> construcción de la fila (este hilo)
+        stages = [fetch_asset, fetch_related]
+        for asset_id, bundle, started_at in iter_pipeline(asset_ids, stages, depth=read_ahead, name='asset-prefetch'):
+            try:
+                asset_data = self._build_asset_result(asset_id, bundle, options)
+            except Exception as e:
+                logger.error(f"Error processing asset {asset_id}: {str(e)}")
+                asset_data = None
+            if on_complete:
+                on_complete(time.time() - started_at)
+            yield asset_id, asset_data
 
     def process_asset(self, asset_id, options):
         """Public method to process a single asset"""
@@ -159,8 +457,38 @@ class AssetManager(FreshServiceAPI):
     def _process_single_asset(self, asset_id, options):
         """Process single asset with all possible options"""
         try:
-            # Obtener datos básicos del asset
-            asset_data = self.get_asset(asset_id)
+            bundle = self._fetch_asset_bundle(asset_id, options)
+            return self._build_asset_result(asset_id, bundle, options)
+        except Exception as e:
+            logger.error(f"Error processing asset {asset_id}: {str(e)}")
+            return None
+
+    def _plan_asset_includes(self, options):
+        """Work out which include=... payloads the selected options need"""
+        includes = []
+        if any(options.get(f'include_{field}') for field in ASSET_TYPE_FIELDS):
+            includes.append('type_fields')
+        return includes
+
+    def _fetch_asset_bundle(self, asset_id, options):
+        """Fetch every payload an asset needs exactly once"""
+        bundle = {'asset': self.get_asset(asset_id, include=self._plan_asset_includes(options))}
+
+        # Los componentes tienen su propio endpoint y no admiten include
+        if bundle['asset'] and options.get('components'):
+            bundle['components'] = self._fetch_components(asset_id)
+
+        return bundle
+
+    def _fetch_components(self, asset_id):
+        """Get the components of an asset from the fresh mirror or the API"""
+        components = self.mirror.get_components(asset_id) if self.mirror.is_fresh() and not self.offline else None
+        return components or self.component_manager.fetch_components(asset_id)
+
+    def _build_asset_result(self, asset_id, bundle, options):
+        """Build the result row for an asset from its fetched payloads"""
+        try:
+            asset_data = bundle.get('asset')
             if not asset_data:
                 logger.warning(f"Asset {asset_id} not found")
                 return None
@@ -178,7 +506,8 @@ class AssetManager(FreshServiceAPI):
                     asset_id,
                     join=not options.get('disable_join', False),
                     combine_cpu_ram=options.get('combine_cpu_ram', False),
-                    specified_components=options['components']
+                    specified_components=options['components'],
+                    components_data=bundle.get('components')
                 )
                 if components and len(components) > 0:
                     result.update(components[0])
@@ -206,28 +535,15 @@ class AssetManager(FreshServiceAPI):
                 result['location'] = location
                 logger.debug(f"Added location: {location}")
 
-            if options.get('include_system_os'):
-                os_info = self._get_system_os(asset_id)
-                result['system_os'] = os_info
-                logger.debug(f"Added OS info: {os_info}")
-
-            if options.get('include_machine_ip'):
-                ip = self._get_machine_ip(asset_id)
-                result['machine_ip'] = ip
-                logger.debug(f"Added IP: {ip}")
-
-            if options.get('include_machine_mac'):
-                mac = self._get_machine_mac(asset_id)
-                result['machine_mac'] = mac
-                logger.debug(f"Added MAC: {mac}")
-
-            if options.get('include_serial_number'):
-                serial = self._get_serial_number(asset_id)
-                result['serial_number'] = serial
-                logger.debug(f"Added serial number: {serial}")
+            # Campos de type_fields extraídos de la misma respuesta
+            for field in ASSET_TYPE_FIELDS:
+                if options.get(f'include_{field}'):
+                    value = self._get_type_field(asset_id, field, asset_data)
+                    result[field] = value
+                    logger.debug(f"Added {field}: {value}")
 
             if options.get('include_description'):
-                desc = self._get_asset_description(asset_id)
+                desc = self._get_asset_description(asset_id, asset_data)
                 result['description'] = desc
                 logger.debug(f"Added description")
 
@@ -267,7 +583,9 @@ class AssetManager(FreshServiceAPI):
 
     def _gather_asset_info(self, asset_id, options):
         """Gather all required information for an asset"""
-        asset_data = self.get_asset(asset_id) if options.get('include_asset_data') else None
+        includes = self._plan_asset_includes(options)
+        needs_asset = options.get('include_asset_data') or includes
+        asset_data = self.get_asset(asset_id, include=includes) if needs_asset else None
         
         info = {
             "asset_data": asset_data,
@@ -275,45 +593,38 @@ class AssetManager(FreshServiceAPI):
             "department_name": self._get_department_name(asset_data) if options.get('include_departments') else None,
             "location_name": self._get_location_name(asset_data) if options.get('include_location') else None,
             "user_info": self._get_user_info(asset_data) if options.get('include_user') else None,
-            "system_os": self._get_system_os(asset_id) if options.get('include_system_os') else None,
-            "machine_ip": self._get_machine_ip(asset_id) if options.get('include_machine_ip') else None,
-            "machine_mac": self._get_machine_mac(asset_id) if options.get('include_machine_mac') else None,
-            "serial_number": self._get_serial_number(asset_id) if options.get('include_serial_number') else None
+            "system_os": self._get_system_os(asset_id, asset_data) if options.get('include_system_os') else None,
+            "machine_ip": self._get_machine_ip(asset_id, asset_data) if options.get('include_machine_ip') else None,
+            "machine_mac": self._get_machine_mac(asset_id, asset_data) if options.get('include_machine_mac') else None,
+            "serial_number": self._get_serial_number(asset_id, asset_data) if options.get('include_serial_number') else None
         }
         
         return info
 
-    def _get_system_os(self, asset_id):
+    def _get_type_field(self, asset_id, field, asset_data=None):
+        """Get a type_fields value, reusing asset_data when it already includes type_fields"""
+        if not asset_data or 'type_fields' not in asset_data:
+            asset_data = self.get_asset(asset_id, include=['type_fields'])
+        if not asset_data:
+            return 'Unknown'
+        type_fields = asset_data.get('type_fields') or {}
+        return type_fields.get(ASSET_TYPE_FIELDS[field], 'Unknown')
+
+    def _get_system_os(self, asset_id, asset_data=None):
         """Get system OS information"""
-        response = self.make_request(f'assets/{asset_id}?include=type_fields')
-        if response and 'asset' in response:
-            type_fields = response['asset'].get('type_fields', {})
-            return type_fields.get('os_23001176139', 'Unknown')
-        return 'Unknown'
+        return self._get_type_field(asset_id, 'system_os', asset_data)
 
-    def _get_machine_ip(self, asset_id):
+    def _get_machine_ip(self, asset_id, asset_data=None):
         """Get machine IP information"""
-        response = self.make_request(f'assets/{asset_id}?include=type_fields')
-        if response and 'asset' in response:
-            type_fields = response['asset'].get('type_fields', {})
-            return type_fields.get('computer_ip_address_23001176139', 'Unknown')
-        return 'Unknown'
+        return self._get_type_field(asset_id, 'machine_ip', asset_data)
 
-    def _get_machine_mac(self, asset_id):
+    def _get_machine_mac(self, asset_id, asset_data=None):
         """Get machine MAC information"""
-        response = self.make_request(f'assets/{asset_id}?include=type_fields')
-        if response and 'asset' in response:
-            type_fields = response['asset'].get('type_fields', {})
-            return type_fields.get('mac_address_23001176139', 'Unknown')
-        return 'Unknown'
+        return self._get_type_field(asset_id, 'machine_mac', asset_data)
 
-    def _get_serial_number(self, asset_id):
+    def _get_serial_number(self, asset_id, asset_data=None):
         """Get machine serial number"""
-        response = self.make_request(f'assets/{asset_id}?include=type_fields')
-        if response and 'asset' in response:
-            type_fields = response['asset'].get('type_fields', {})
-            return type_fields.get('serial_number_23001176134', 'Unknown')
-        return 'Unknown'
+        return self._get_type_field(asset_id, 'serial_number', asset_data)
 
     def export_data(self, data, output_file=None, verbose=True):
         """Export data to Excel and/or console"""
@@ -335,15 +646,29 @@ class AssetManager(FreshServiceAPI):
             self.excel_manager.export_to_excel(df, output_file)
         
         if verbose:
-            print(df)
+            print(render_table(df))
 
     def map_department_name_to_id(self, department_name):
-        """Map department name to ID with improved error handling"""
+        """Map department name to ID (local fuzzy index, remote exact query as fallback)"""
         try:
+            dept_id, ambiguous = self._find_reference_id('departments', department_name)
+            if dept_id is not None or ambiguous:
+                return dept_id
+            if self.offline or self.reference_data.has_records('departments'):
+                print(f"{Fore.YELLOW}Warning: No department found with name '{department_name}'")
+                return None
+
+            negative_key = f'name/{department_name.strip().lower()}'
+            if self.cache.is_negative(negative_key, 'departments'):
+                print(f"{Fore.YELLOW}Warning: No department found with name '{department_name}' (cached)")
+                return None
+
             query = f'departments/?query="name:\'{department_name}\'"'
             data = self.make_request(query)
             if data and 'departments' in data and len(data['departments']) > 0:
                 return data['departments'][0]['id']
+            if data is not None:
+                self.cache.set_negative(negative_key, 'departments', reason='no_results')
             print(f"{Fore.YELLOW}Warning: No department found with name '{department_name}'")
             return None
         except Exception as e:
@@ -351,20 +676,53 @@ class AssetManager(FreshServiceAPI):
             return None
 
     def map_location_name_to_id(self, location_name):
-        """Map location name to ID"""
+        """Map location name to ID (local fuzzy index, remote exact query as fallback)"""
+        loc_id, ambiguous = self._find_reference_id('locations', location_name)
+        if loc_id is not None or ambiguous:
+            return loc_id
+        if self.offline or self.reference_data.has_records('locations'):
+            print(f"{Fore.YELLOW}Warning: No location found with name '{location_name}'.")
+            return None
+
+        negative_key = f'name/{location_name.strip().lower()}'
+        if self.cache.is_negative(negative_key, 'locations'):
+            print(f"{Fore.YELLOW}Warning: No location found with name '{location_name}' (cached).")
+            return None
+
         data = self.make_request(f'locations/?query="name:\'{location_name}\'"')
         if data and 'locations' in data and len(data['locations']) > 0:
             return data['locations'][0]['id']
+        if data is not None:
+            self.cache.set_negative(negative_key, 'locations', reason='no_results')
         print(f"{Fore.YELLOW}Warning: No location found with name '{location_name}'.")
         return None
 
+    def _find_reference_id(self, collection, name):
+        """Find a department/location ID by name in the local search index; returns (id, ambiguous)"""
+        record, candidates = self.reference_data.find(collection, name)
+        if record is not None:
+            logger.info(f"'{name}' matched {collection} '{record.get('name')}' (ID {record['id']})")
+            return record['id'], False
+        if candidates:
+            self._print_candidates(name, [f"{candidate.get('name')} (ID {candidate['id']})" for candidate in candidates])
+            return None, True
+        return None, False
+
+    def _print_candidates(self, name, candidates):
+        """Warn that a name matches several records instead of picking one of them"""
+        print(f"{Fore.YELLOW}'{name}' coincide con varios registros; especifique el nombre completo:")
+        for candidate in candidates:
+            print(f"{Fore.YELLOW}  - {candidate}")
+
+    def resolve_reference_names(self, ids_by_collection):
+        """Resolve many reference IDs in one batch: {collection: ids} -> {collection: {id: name}}"""
+        return self.reference_data.resolve(ids_by_collection)
+
     def _get_department_name(self, asset_data):
         """Get department name with proper handling"""
         if not asset_data or 'department_id' not in asset_data:
             return 'Unknown'
-        
-        departments = self.get_departments()
-        return departments.get(asset_data['department_id'], 'Unknown')
+        return self.reference_data.get_name('departments', asset_data['department_id'])
 
     def get_location_name(self, location_id):
         """Get location name with improved error handling"""
@@ -372,15 +730,7 @@ class AssetManager(FreshServiceAPI):
             return 'Unknown'
             
         try:
-            # Try direct API call first
-            response = self.get_cached_request(f'locations/{location_id}')
-            if response and 'location' in response:
-                return response['location'].get('name', 'Unknown')
-
-            # Fallback to cached locations list
-            locations = self.get_locations()
-            location_name = locations.get(location_id, 'Unknown')
-            
+            location_name = self.reference_data.get_name('locations', location_id)
             if location_name == 'Unknown':
                 print(f"{Fore.YELLOW}Warning: Location ID {location_id} not found")
             
@@ -408,10 +758,7 @@ class AssetManager(FreshServiceAPI):
         if not type_id:
             return 'Unknown'
             
-        response = self.get_cached_request(f'asset_types/{type_id}')
-        if response and 'asset_type' in response:
-            return response['asset_type']['name']
-        return 'Unknown'
+        return self.reference_data.get_name('asset_types', type_id)
 
     def _get_user_info(self, asset_data):
         """Get detailed user information"""
@@ -433,11 +780,7 @@ class AssetManager(FreshServiceAPI):
 
     def get_asset_types(self):
         """Get all asset types"""
-        url = 'asset_types'
-        data = self.get_cached_request(url)
-        if data and 'asset_types' in data:
-            return {asset_type['id']: asset_type['name'] for asset_type in data['asset_types']}
-        return {}
+        return self.reference_data.get_names('asset_types')
 
     def get_asset_with_type_fields(self, asset_id):
         """Get asset with type fields included"""
@@ -465,63 +808,82 @@ class AssetManager(FreshServiceAPI):
             }
         return None
 
-    def _get_asset_description(self, asset_id):
+    def _get_asset_description(self, asset_id, asset_data=None):
         """Get asset description"""
-        if asset_data := self.get_asset(asset_id):
+        if asset_data := asset_data or self.get_asset(asset_id):
             return asset_data.get('description', 'Unknown')
         return 'Unknown'
 
     def find_user_by_name(self, first_name, last_name):
         """Find user by first and last name"""
-        query = f'requesters?query="first_name:\'{first_name}\'"&query="last_name:\'{last_name}\'"'
-        response = self.make_request(query)
-        if response and 'requesters' in response and response['requesters']:
-            return response['requesters'][0]['id']
-        print(f"{Fore.YELLOW}No user found with name: {first_name} {last_name}")
-        return None
+        user = self.get_user_by_name(first_name, last_name)
+        return user['id'] if user else None
 
     def get_user_by_name(self, first_name, last_name):
         """Get user by first and last name with full details"""
-        query = f'requesters?query="first_name:\'{first_name}\'"&query="last_name:\'{last_name}\'"'
-        response = self.make_request(query)
-        if response and 'requesters' in response and response['requesters']:
-            return response['requesters'][0]
-        print(f"{Fore.YELLOW}No se encontró ningún usuario con nombre: {first_name} {last_name}")
+        return self.find_user(f'{first_name} {last_name}')
+
+    def find_user(self, full_name):
+        """Find a requester by full name (local fuzzy index, remote exact query as fallback)"""
+        user, candidates = self.reference_data.find('requesters', full_name)
+        if user is not None:
+            return user
+        if candidates:
+            self._print_candidates(full_name, [
+                f"{candidate.get('first_name', '')} {candidate.get('last_name', '')} "
+                f"<{candidate.get('primary_email') or '-'}> (ID {candidate['id']})"
+                for candidate in candidates
+            ])
+            return None
+
+        if not self.offline and not self.reference_data.has_records('requesters') and ' ' in full_name.strip():
+            first_name, last_name = full_name.strip().split(' ', 1)
+            query = f'requesters?query="first_name:\'{first_name}\'"&query="last_name:\'{last_name}\'"'
+            response = self.make_request(query)
+            if response and 'requesters' in response and response['requesters']:
+                return response['requesters'][0]
+
+        print(f"{Fore.YELLOW}No se encontró ningún usuario con nombre: {full_name}")
         return None
 
     def get_assets_by_user(self, user_id):
         """Get all assets associated with a user"""
-        query = f'assets?query="user_id:{user_id}"'
-        assets = []
-        page = 1
-        
-        while True:
-            response = self.make_request(f"{query}&page={page}")
-            if not response or 'assets' not in response or not response['assets']:
-                break
-            assets.extend(response['assets'])
-            page += 1
-            
-        return sorted(assets, key=lambda x: int(x.get('display_id', 0)))
+        return sorted(self.iter_assets_by_user(user_id), key=lambda x: int(x.get('display_id', 0)))
 
     def get_assets_by_department(self, department_id):
         """Get all assets in a department"""
-        query = f'assets?query="department_id:{department_id}"'
-        return self._get_assets_with_query(query)
+        return sorted(self.iter_assets_by_department(department_id), key=lambda x: int(x['display_id']))
 
     def get_assets_by_location(self, location_id):
         """Get all assets in a location"""
-        query = f'assets?query="location_id:{location_id}"'
-        return self._get_assets_with_query(query)
+        return sorted(self.iter_assets_by_location(location_id), key=lambda x: int(x['display_id']))
+
+    def iter_assets_by_user(self, user_id, read_ahead=None):
+        """Yield the assets of a user as each page arrives"""
+        if self._use_mirror():
+            return self.mirror.iter_assets('user_id', user_id)
+        return self._iter_assets_with_query(f'assets?query="user_id:{user_id}"', read_ahead)
+
+    def iter_assets_by_department(self, department_id, read_ahead=None):
+        """Yield the assets of a department as each page arrives"""
+        if self._use_mirror():
+            return self.mirror.iter_assets('department_id', department_id)
+        return self._iter_assets_with_query(f'assets?query="department_id:{department_id}"', read_ahead)
+
+    def iter_assets_by_location(self, location_id, read_ahead=None):
+        """Yield the assets of a location as each page arrives"""
+        if self._use_mirror():
+            return self.mirror.iter_assets('location_id', location_id)
+        return self._iter_assets_with_query(f'assets?query="location_id:{location_id}"', read_ahead)
+
+    def sync_mirror(self, full=False):
+        """Sync the local asset mirror (full the first time, then incremental by updated_at)"""
+        return self.mirror.sync(self, full=full)
 
     def _get_assets_with_query(self, query):
         """Get assets using a query with pagination"""
-        assets = []
-        page = 1
-        while True:
-            response = self.make_request(f"{query}&page={page}")
-            if not response or 'assets' not in response or not response['assets']:
-                break
-            assets.extend(response['assets'])
-            page += 1
-        return sorted(assets, key=lambda x: int(x['display_id']))
\ No newline at end of file
+        return sorted(self._iter_assets_with_query(query), key=lambda x: int(x['display_id']))
+
+    def _iter_assets_with_query(self, query, read_ahead=None):
+        """Yield assets matching a query page by page"""
+        return self.iter_items(query, key='assets', read_ahead=read_ahead)
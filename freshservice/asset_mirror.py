@@ -0,0 +1,213 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .config import MIRROR_CONFIG
+
+logger = logging.getLogger(__name__)
+
+class AssetMirror:
+    """Local SQLite copy of the asset inventory (with type_fields and components), synced by updated_at"""
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS assets (
+            display_id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            department_id INTEGER,
+            location_id INTEGER,
+            asset_type_id INTEGER,
+            updated_at TEXT,
+            payload TEXT NOT NULL,
+            synced_at REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_assets_user ON assets (user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_assets_department ON assets (department_id)",
+        "CREATE INDEX IF NOT EXISTS idx_assets_location ON assets (location_id)",
+        """CREATE TABLE IF NOT EXISTS components (
+            display_id INTEGER PRIMARY KEY,
+            payload TEXT NOT NULL,
+            synced_at REAL NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS sync_state (
+            name TEXT PRIMARY KEY,
+            value TEXT
+        )"""
+    ]
+
+    # Campos por los que se puede buscar en el espejo
+    INDEXED_FIELDS = ('user_id', 'department_id', 'location_id')
+
+    def __init__(self, path=None):
+        if path is None:
+            from . import CACHE_DIR
+            path = os.path.join(CACHE_DIR, MIRROR_CONFIG['filename'])
+        self.path = str(path)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._local = threading.local()
+
+        conn = self._connect()
+        with conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+
+    def _connect(self):
+        """Get this thread's connection (sqlite3 connections can't be shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _get_state(self, name):
+        row = self._connect().execute('SELECT value FROM sync_state WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, conn, name, value):
+        conn.execute('INSERT OR REPLACE INTO sync_state (name, value) VALUES (?, ?)', (name, str(value)))
+
+    def get_last_sync(self):
+        """Get the time of the last successful sync (epoch seconds) or None"""
+        value = self._get_state('last_sync')
+        return float(value) if value else None
+
+    def is_fresh(self, max_staleness_hours=None):
+        """Whether the mirror was synced within the staleness bound"""
+        if not MIRROR_CONFIG['enabled']:
+            return False
+        last_sync = self.get_last_sync()
+        if last_sync is None:
+            return False
+        if max_staleness_hours is None:
+            max_staleness_hours = MIRROR_CONFIG['max_staleness_hours']
+        return time.time() - last_sync <= max_staleness_hours * 3600
+
+    def get_asset(self, display_id):
+        """Get a mirrored asset (type_fields included) or None"""
+        row = self._connect().execute(
+            'SELECT payload FROM assets WHERE display_id = ?', (int(display_id),)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_components(self, display_id):
+        """Get the mirrored components response of an asset or None"""
+        row = self._connect().execute(
+            'SELECT payload FROM components WHERE display_id = ?', (int(display_id),)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_assets(self, field, value):
+        """Yield the mirrored assets whose field (user_id, department_id, location_id) equals value"""
+        if field not in self.INDEXED_FIELDS:
+            raise ValueError(f"Unsupported mirror field: {field}")
+        cursor = self._connect().execute(
+            f'SELECT payload FROM assets WHERE {field} = ? ORDER BY display_id', (value,)
+        )
+        for (payload,) in cursor:
+            yield json.loads(payload)
+
+    def iter_display_ids(self):
+        """Yield the display_id of every mirrored asset in order"""
+        for (display_id,) in self._connect().execute('SELECT display_id FROM assets ORDER BY display_id'):
+            yield display_id
+
+    def count(self):
+        return self._connect().execute('SELECT COUNT(*) FROM assets').fetchone()[0]
+
+    def sync(self, api, full=False, components=None):
+        """Pull assets into the mirror: everything the first time (or with full=True), then only updated_at changes"""
+        if components is None:
+            components = MIRROR_CONFIG['sync_components']
+        high_water = None if full else self._get_state('high_water')
+        started_at = time.time()
+
+        if high_water:
+            # Solapamiento de un día: el filtro de la API trabaja con fechas, los upserts lo hacen idempotente
+            since = high_water[:10]
+            logger.info(f"Incremental mirror sync since {since}")
+            endpoint = f'assets?include=type_fields&filter="updated_at:>\'{since}\'"'
+        else:
+            logger.info("Full mirror sync")
+            endpoint = 'assets?include=type_fields'
+
+        seen = []
+        batch = []
+        new_high_water = high_water
+        for asset in api.iter_items(endpoint, key='assets'):
+            batch.append(asset)
+            seen.append(asset['display_id'])
+            if asset.get('updated_at') and (new_high_water is None or asset['updated_at'] > new_high_water):
+                new_high_water = asset['updated_at']
+            if len(batch) >= MIRROR_CONFIG['batch_size']:
+                self._store_assets(batch)
+                batch = []
+        self._store_assets(batch)
+
+        if components and seen:
+            self._sync_components(api, seen)
+
+        conn = self._connect()
+        with conn:
+            if not high_water:
+                # Una sincronización completa también elimina los assets borrados en Freshservice
+                conn.execute('CREATE TEMP TABLE IF NOT EXISTS seen_ids (display_id INTEGER PRIMARY KEY)')
+                conn.execute('DELETE FROM seen_ids')
+                conn.executemany('INSERT OR IGNORE INTO seen_ids VALUES (?)', ((i,) for i in seen))
+                conn.execute('DELETE FROM assets WHERE display_id NOT IN (SELECT display_id FROM seen_ids)')
+                conn.execute('DELETE FROM components WHERE display_id NOT IN (SELECT display_id FROM seen_ids)')
+                self._set_state(conn, 'last_full_sync', started_at)
+            if new_high_water:
+                self._set_state(conn, 'high_water', new_high_water)
+            self._set_state(conn, 'last_sync', started_at)
+
+        return {
+            'mode': 'incremental' if high_water else 'full',
+            'assets_synced': len(seen),
+            'total_assets': self.count(),
+            'elapsed': time.time() - started_at
+        }
+
+    def _store_assets(self, assets):
+        if not assets:
+            return
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO assets '
+                '(display_id, user_id, department_id, location_id, asset_type_id, updated_at, payload, synced_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(
+                    asset['display_id'], asset.get('user_id'), asset.get('department_id'),
+                    asset.get('location_id'), asset.get('asset_type_id'), asset.get('updated_at'),
+                    json.dumps(asset), now
+                ) for asset in assets]
+            )
+
+    def _sync_components(self, api, display_ids):
+        """Fetch the components of the given assets concurrently"""
+        def fetch(display_id):
+            return display_id, api.make_request(f'assets/{display_id}/components')
+
+        rows = []
+        with ThreadPoolExecutor(max_workers=MIRROR_CONFIG['sync_workers'], thread_name_prefix='mirror-sync') as executor:
+            for display_id, data in executor.map(fetch, display_ids):
+                if data is not None:
+                    rows.append((display_id, json.dumps(data), time.time()))
+                if len(rows) >= MIRROR_CONFIG['batch_size']:
+                    self._store_components(rows)
+                    rows = []
+        self._store_components(rows)
+
+    def _store_components(self, rows):
+        if not rows:
+            return
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO components (display_id, payload, synced_at) VALUES (?, ?, ?)', rows
+            )
@@ -0,0 +1,280 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from itertools import islice
+import aiohttp
+from .config import ASYNC_CONFIG, CACHE_CONFIG, HTTP_CONFIG, RATE_LIMIT_DELAY
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+# AssetManager.process_assets lo usa bajo demanda (--async o ASYNC_CONFIG['enabled']): el motor de
+# hilos sigue siendo el predeterminado porque también cubre --workers, --read-ahead y el modo offline
+class AsyncFreshServiceAPI:
+    """asyncio client sharing cache, rate limiter and asset planner with a sync AssetManager"""
+
+    def __init__(self, api, max_concurrency=None):
+        self.api = api
+        self.base_url = api.base_url
+        self.cache = api.cache
+        self.rate_limiter = api.rate_limiter
+        self.max_concurrency = max_concurrency or ASYNC_CONFIG['max_concurrency']
+        self.session = None
+        self._semaphore = None
+        self._inflight = {}
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=ASYNC_CONFIG['keepalive_timeout'])
+        self.session = aiohttp.ClientSession(
+            auth=aiohttp.BasicAuth(self.api.api_key or '', ''),
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=HTTP_CONFIG['timeout'])
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.close()
+        self.session = None
+
+    async def _acquire_rate_limit(self):
+        """Wait for a rate limit token without blocking the event loop"""
+        waited = 0.0
+        while True:
+            wait = self.rate_limiter.try_acquire(waited)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+            waited += wait
+
+    async def make_request(self, endpoint, method='GET', params=None, data=None, max_retries=3):
+        """Make API request (async)"""
+        status, _, body = await self._send_request(endpoint, method, params, data, max_retries)
+        return body if status == 200 else None
+
+    async def _send_request(self, endpoint, method='GET', params=None, data=None, max_retries=3, headers=None):
+        """Send API request (async); returns (status, headers, json body or None)"""
+        endpoint = endpoint.lstrip('/')
+        url = f'{self.base_url}{endpoint}'
+        logger.info(f"Async API Request: {method} {url}")
+
+        retries = 0
+        while retries <= max_retries:
+            try:
+                await self._acquire_rate_limit()
+                async with self._semaphore:
+                    async with self.session.request(method, url, params=params, json=data, headers=headers) as response:
+                        logger.info(f"Response status: {response.status}")
+                        self.rate_limiter.update_from_response(_ResponseInfo(response))
+
+                        if response.status == 429:
+                            wait_time = int(response.headers.get('Retry-After', RATE_LIMIT_DELAY))
+                            self.rate_limiter.pause(wait_time)
+                            retries += 1
+                            logger.warning(f"Rate limit alcanzado. Reintento {retries}/{max_retries}")
+                            continue
+
+                        if response.status in HTTP_CONFIG['status_forcelist']:
+                            raise aiohttp.ClientResponseError(
+                                response.request_info, response.history, status=response.status
+                            )
+
+                        if response.status == 304:
+                            return response.status, response.headers, None
+
+                        if response.status != 200:
+                            logger.error(f"Error response: {await response.text()}")
+                            return response.status, response.headers, None
+
+                        return response.status, response.headers, await response.json()
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Request failed: {str(e)}")
+                retries += 1
+                if retries <= max_retries:
+                    logger.warning(f"Reintentando petición ({retries}/{max_retries})...")
+                    await asyncio.sleep(HTTP_CONFIG['backoff_factor'] * (2 ** retries))
+                else:
+                    return None, None, None
+
+        return None, None, None
+
+    async def get_cached_request(self, endpoint):
+        """Get cached request or make new one (async)"""
+        cache_type = endpoint.split('/')[0] or 'general'
+        if cache_type in CACHE_CONFIG.get('excluded_endpoints', []):
+            return await self.make_request(endpoint)
+
+        # La caché en disco es SQLite: sus llamadas bloqueantes van a un hilo, fuera del event loop
+        entry = await asyncio.to_thread(self.cache.lookup, endpoint, cache_type=cache_type)
+        if entry is not None:
+            if entry['fresh']:
+                return entry['data']
+            if CACHE_CONFIG.get('stale_while_revalidate'):
+                # El refresco usa el cliente síncrono en el pool de la caché, fuera del event loop
+                self.cache.refresh_in_background(
+                    endpoint, cache_type, lambda: self.api._fetch_for_cache(endpoint, cache_type, entry)
+                )
+                return entry['data']
+
+        # Varias tareas pueden pedir la misma referencia a la vez: compartir la petición
+        if endpoint in self._inflight:
+            return await self._inflight[endpoint]
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[endpoint] = future
+        try:
+            data = await self._fetch_for_cache(endpoint, cache_type, entry)
+            future.set_result(data)
+            return data
+        except Exception as e:
+            future.set_exception(e)
+            # Si nadie más esperaba la petición, marcar la excepción como recogida (evita el aviso de asyncio)
+            future.exception()
+            raise
+        finally:
+            del self._inflight[endpoint]
+
+    async def _fetch_for_cache(self, endpoint, cache_type, entry=None):
+        """Fetch an endpoint into the cache, revalidating `entry` with a conditional GET when possible"""
+        headers = self.cache.get_conditional_headers(entry)
+        status, response_headers, data = await self._send_request(endpoint, headers=headers)
+        if headers and status:
+            self.cache.record_revalidation(cache_type, status == 304)
+        if status == 304:
+            await asyncio.to_thread(self.cache.touch, endpoint, cache_type)
+            return entry['data']
+        if data is not None:
+            await asyncio.to_thread(
+                self.cache.set, endpoint, data, cache_type=cache_type, validators=self.cache.get_validators(response_headers)
+            )
+        return data
+
+    async def fetch_asset_bundle(self, asset_id, options):
+        """Fetch every payload an asset needs exactly once (async version of the sync planner)"""
+        if await asyncio.to_thread(self.cache.is_negative, f'assets/{asset_id}', 'assets'):
+            return {'asset': None}
+
+        mirror = getattr(self.api, 'mirror', None)
+        if mirror is not None and await asyncio.to_thread(mirror.is_fresh):
+            asset = await asyncio.to_thread(mirror.get_asset, asset_id)
+            if asset:
+                bundle = {'asset': asset}
+                if options.get('components'):
+                    bundle['components'] = (await asyncio.to_thread(mirror.get_components, asset_id)
+                                            or await self.make_request(f'assets/{asset_id}/components'))
+                return bundle
+
+        includes = self.api._plan_asset_includes(options)
+        endpoint = f'assets/{asset_id}'
+        if includes:
+            endpoint += f"?include={','.join(includes)}"
+
+        status, _, response = await self._send_request(endpoint)
+        if status == 404:
+            await asyncio.to_thread(self.cache.set_negative, f'assets/{asset_id}', 'assets')
+        bundle = {'asset': response.get('asset') if response else None}
+
+        if bundle['asset'] and options.get('components'):
+            bundle['components'] = await self.make_request(f'assets/{asset_id}/components')
+
+        return bundle
+
+    async def _prefetch_references(self, asset_data, options):
+        """Warm the cache with the referenced records the build stage will read"""
+        # Tipos, departamentos y ubicaciones ya están en api.reference_data
+        endpoints = []
+        if options.get('include_user') and asset_data.get('user_id'):
+            endpoints.append(f"requesters/{asset_data['user_id']}")
+        await asyncio.gather(*(self.get_cached_request(endpoint) for endpoint in endpoints))
+
+    async def _process_one(self, asset_id, options, build, on_complete):
+        start = time.time()
+        try:
+            bundle = await self.fetch_asset_bundle(asset_id, options)
+            if bundle.get('asset'):
+                await self._prefetch_references(bundle['asset'], options)
+            # La construcción del resultado es síncrona: ejecutarla fuera del event loop
+            result = await asyncio.to_thread(build, asset_id, bundle, options)
+        except Exception as e:
+            logger.error(f"Error processing asset {asset_id}: {str(e)}")
+            result = None
+
+        if on_complete:
+            on_complete(time.time() - start)
+        return result
+
+    async def iter_process_assets(self, asset_ids, options, build, on_complete=None):
+        """Yield (asset_id, data) in input order with a bounded number of assets in flight"""
+        ids_iter = iter(asset_ids)
+        pending = deque()
+
+        def schedule(asset_id):
+            task = asyncio.create_task(self._process_one(asset_id, options, build, on_complete))
+            pending.append((asset_id, task))
+
+        for asset_id in islice(ids_iter, self.max_concurrency * 2):
+            schedule(asset_id)
+
+        while pending:
+            asset_id, task = pending.popleft()
+            result = await task
+            next_id = next(ids_iter, None)
+            if next_id is not None:
+                schedule(next_id)
+            yield asset_id, result
+
+class _ResponseInfo:
+    """Adapter exposing an aiohttp response like a requests.Response for the rate limiter"""
+
+    def __init__(self, response):
+        self.headers = response.headers
+        self.status_code = response.status
+
+def iter_process_assets_sync(api, asset_ids, options, build, max_concurrency=None, on_complete=None):
+    """Run the async pipeline in a background event loop and yield (asset_id, data) in input order"""
+    results = queue.Queue(maxsize=(max_concurrency or ASYNC_CONFIG['max_concurrency']) * 2)
+    stop = threading.Event()
+
+    def put(item):
+        # Espera acotada para poder abandonar si el consumidor deja de leer
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    async def main():
+        async with AsyncFreshServiceAPI(api, max_concurrency) as client:
+            async for item in client.iter_process_assets(asset_ids, options, build, on_complete):
+                if not await asyncio.to_thread(put, item):
+                    break
+
+    def runner():
+        try:
+            asyncio.run(main())
+        except Exception as e:
+            logger.error(f"Async pipeline failed: {e}")
+            put(e)
+        finally:
+            put(_DONE)
+
+    thread = threading.Thread(target=runner, name='async-pipeline', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join(timeout=5)
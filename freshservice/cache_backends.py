@@ -0,0 +1,245 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Prefijo de cache_type de las entradas negativas (404 y búsquedas sin resultados)
+NEGATIVE_PREFIX = 'negative_'
+
+class CacheBackend:
+    """Persistent store behind CacheManager; entries are dicts with payload, fetched_at, ttl and validators"""
+
+    def get(self, key, cache_type):
+        """Get the stored entry for a key or None"""
+        raise NotImplementedError
+
+    def set(self, key, cache_type, payload, fetched_at, ttl, validators=None):
+        """Store a serialized payload"""
+        raise NotImplementedError
+
+    def touch(self, key, cache_type, fetched_at):
+        """Update the fetched_at of an entry without rewriting its payload"""
+        raise NotImplementedError
+
+    def delete(self, key, cache_type):
+        raise NotImplementedError
+
+    def clear(self, cache_type=None):
+        """Remove every entry, or only those of a cache_type"""
+        raise NotImplementedError
+
+    def purge_expired(self, grace=0):
+        """Remove the entries whose TTL (plus grace seconds) has passed; returns how many were removed"""
+        raise NotImplementedError
+
+class JsonFileBackend(CacheBackend):
+    """One JSON file per key under <cache_dir>/<cache_type>/ (original storage layout)"""
+
+    SUBDIRS = ('locations', 'departments', 'assets', 'general', 'requesters')
+
+    def __init__(self, cache_dir, default_ttl=None):
+        self.cache_dir = cache_dir
+        self.default_ttl = default_ttl
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for subdir in self.SUBDIRS:
+            os.makedirs(os.path.join(self.cache_dir, subdir), exist_ok=True)
+
+    def _get_cache_dir(self, cache_type):
+        """Get appropriate cache directory based on type"""
+        if cache_type.startswith(NEGATIVE_PREFIX):
+            # Entradas negativas en su propio árbol: negative/<tipo>/
+            return os.path.join(self.cache_dir, 'negative', cache_type[len(NEGATIVE_PREFIX):])
+        if cache_type in self.SUBDIRS:
+            return os.path.join(self.cache_dir, cache_type)
+        return self.cache_dir
+
+    def _get_cache_file(self, key, cache_type):
+        # Sanitizar la key
+        key = str(key).replace('/', '_').replace('\\', '_')
+        return os.path.join(self._get_cache_dir(cache_type), f"{key}.json")
+
+    def _get_validators_file(self, cache_file):
+        # Los validadores (ETag/Last-Modified) van en un fichero aparte para no alterar el payload
+        return f"{cache_file[:-len('.json')]}.validators.json"
+
+    def get(self, key, cache_type):
+        cache_file = self._get_cache_file(key, cache_type)
+        try:
+            fetched_at = os.path.getmtime(cache_file)
+            with open(cache_file, 'r') as f:
+                payload = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            with open(self._get_validators_file(cache_file), 'r') as f:
+                validators = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            validators = None
+        # Los ficheros no guardan TTL: se usa el TTL por defecto
+        return {'payload': payload, 'fetched_at': fetched_at, 'ttl': self.default_ttl, 'validators': validators}
+
+    def set(self, key, cache_type, payload, fetched_at, ttl, validators=None):
+        cache_file = self._get_cache_file(key, cache_type)
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        # Escritura atómica: varios workers pueden escribir la misma key a la vez
+        tmp_file = f"{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_file, 'w') as f:
+            f.write(payload)
+        os.replace(tmp_file, cache_file)
+        os.utime(cache_file, (fetched_at, fetched_at))
+
+        validators_file = self._get_validators_file(cache_file)
+        if validators:
+            tmp_file = f"{validators_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(validators, f)
+            os.replace(tmp_file, validators_file)
+        elif os.path.exists(validators_file):
+            os.remove(validators_file)
+
+    def touch(self, key, cache_type, fetched_at):
+        try:
+            os.utime(self._get_cache_file(key, cache_type), (fetched_at, fetched_at))
+        except FileNotFoundError:
+            pass
+
+    def delete(self, key, cache_type):
+        cache_file = self._get_cache_file(key, cache_type)
+        for path in (cache_file, self._get_validators_file(cache_file)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def clear(self, cache_type=None):
+        if cache_type:
+            directory = self._get_cache_dir(cache_type)
+            if os.path.exists(directory):
+                for file in os.listdir(directory):
+                    if file.endswith('.json'):
+                        os.remove(os.path.join(directory, file))
+            return
+        for path, _ in self._iter_files():
+            os.remove(path)
+
+    def _iter_files(self):
+        """Yield (path, mtime) for every cache file, including the negative/ tree"""
+        for directory, _, files in os.walk(self.cache_dir):
+            for file in files:
+                if file.endswith('.json'):
+                    path = os.path.join(directory, file)
+                    yield path, os.path.getmtime(path)
+
+    def purge_expired(self, grace=0):
+        if self.default_ttl is None:
+            return 0
+        removed = 0
+        now = time.time()
+        for path, mtime in list(self._iter_files()):
+            if now - mtime > self.default_ttl + grace:
+                os.remove(path)
+                removed += 1
+        return removed
+
+class SqliteBackend(CacheBackend):
+    """Single SQLite database in WAL mode, safe for concurrent CLI runs and web workers"""
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS cache_entries (
+            cache_type TEXT NOT NULL,
+            key TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            fetched_at REAL NOT NULL,
+            ttl REAL,
+            validators TEXT,
+            PRIMARY KEY (cache_type, key)
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_cache_entries_expiry ON cache_entries (fetched_at + ttl)"
+    ]
+
+    def __init__(self, path, busy_timeout=5.0, purge_grace=0):
+        self.path = str(path)
+        self.busy_timeout = busy_timeout
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._local = threading.local()
+
+        conn = self._connect()
+        with conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            # Bases de datos creadas antes de guardar validadores
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(cache_entries)')}
+            if 'validators' not in columns:
+                conn.execute('ALTER TABLE cache_entries ADD COLUMN validators TEXT')
+        removed = self.purge_expired(purge_grace)
+        if removed:
+            logger.info(f"Purged {removed} expired cache entries")
+
+    def _connect(self):
+        """Get this thread's connection (sqlite3 connections can't be shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout)
+            # WAL: lectores concurrentes sin bloquear al escritor, entre procesos también
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, cache_type):
+        row = self._connect().execute(
+            'SELECT payload, fetched_at, ttl, validators FROM cache_entries WHERE cache_type = ? AND key = ?',
+            (cache_type, str(key))
+        ).fetchone()
+        if row is None:
+            return None
+        validators = json.loads(row[3]) if row[3] else None
+        return {'payload': row[0], 'fetched_at': row[1], 'ttl': row[2], 'validators': validators}
+
+    def set(self, key, cache_type, payload, fetched_at, ttl, validators=None):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO cache_entries (cache_type, key, payload, fetched_at, ttl, validators) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (cache_type, str(key), payload, fetched_at, ttl, json.dumps(validators) if validators else None)
+            )
+
+    def touch(self, key, cache_type, fetched_at):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                'UPDATE cache_entries SET fetched_at = ? WHERE cache_type = ? AND key = ?',
+                (fetched_at, cache_type, str(key))
+            )
+
+    def delete(self, key, cache_type):
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM cache_entries WHERE cache_type = ? AND key = ?', (cache_type, str(key)))
+
+    def clear(self, cache_type=None):
+        conn = self._connect()
+        with conn:
+            if cache_type:
+                conn.execute('DELETE FROM cache_entries WHERE cache_type = ?', (cache_type,))
+            else:
+                conn.execute('DELETE FROM cache_entries')
+
+    def purge_expired(self, grace=0):
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute('DELETE FROM cache_entries WHERE fetched_at + ttl < ?', (time.time() - grace,))
+        return cursor.rowcount
+
+def create_cache_backend(name, cache_dir, default_ttl=None, purge_grace=0):
+    """Build the cache backend selected in CACHE_CONFIG['backend']"""
+    if name == 'json':
+        return JsonFileBackend(cache_dir, default_ttl)
+    if name == 'sqlite':
+        return SqliteBackend(os.path.join(cache_dir, 'cache.sqlite3'), purge_grace=purge_grace)
+    raise ValueError(f"Unknown cache backend: {name}")
@@ -1,98 +1,290 @@
 import json
-import os
 import logging
-from datetime import datetime, timedelta
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from .cache_backends import NEGATIVE_PREFIX, create_cache_backend
+from .config import CACHE_CONFIG
+
+class MemoryCache:
+    """Bounded in-process LRU keeping (data, fetched_at, validators) for the hottest cache keys"""
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        self.max_entries = max_entries if max_entries is not None else CACHE_CONFIG['memory_max_entries']
+        self.max_bytes = max_bytes if max_bytes is not None else CACHE_CONFIG['memory_max_bytes']
+        self.size_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Get (data, fetched_at, validators) for a key and mark it as recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], entry[1], entry[3]
+
+    def set(self, key, data, size, fetched_at=None, validators=None):
+        """Store an entry, evicting the least recently used ones over the limits"""
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (data, fetched_at or time.time(), size, validators)
+            self.size_bytes += size
+            while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= evicted[2]
+
+    def touch(self, key, fetched_at):
+        """Update the fetched_at of an entry that was revalidated"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (entry[0], fetched_at, entry[2], entry[3])
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self, prefix=None):
+        """Remove every entry, or only those whose key starts with prefix"""
+        with self._lock:
+            for key in [key for key in self._entries if prefix is None or key[0] == prefix]:
+                self._remove(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= entry[2]
+
+    def __len__(self):
+        return len(self._entries)
 
 class CacheManager:
-    def __init__(self):
+    def __init__(self, backend=None):
         from . import CACHE_DIR
         self.cache_dir = CACHE_DIR
+        self.default_ttl = self.get_ttl('general')
+        self.stale_seconds = CACHE_CONFIG['stale_max_hours'] * 3600
+        # Capa en memoria delante del almacén persistente (write-through)
+        self.memory = MemoryCache()
+        self.stats = defaultdict(lambda: {
+            'memory_hits': 0, 'disk_hits': 0, 'stale_hits': 0, 'misses': 0, 'background_refreshes': 0,
+            'revalidations': 0, 'not_modified': 0
+        })
+        self._stats_lock = threading.Lock()
+        # Refresco en segundo plano de entradas caducadas (stale-while-revalidate)
+        self._refresher = None
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
         
         try:
-            # Crear directorio principal
-            os.makedirs(self.cache_dir, exist_ok=True)
-            
-            # Definir y crear subdirectorios
-            self.subdirs = {
-                'locations': 'locations',
-                'departments': 'departments',
-                'assets': 'assets',
-                'general': 'general',
-                'requesters': 'requesters'  # Agregar subdirectorio para requesters
-            }
-            
-            # Crear todos los subdirectorios
-            for subdir in self.subdirs.values():
-                subdir_path = os.path.join(self.cache_dir, subdir)
-                os.makedirs(subdir_path, exist_ok=True)
-                
-            logging.info(f"Cache directories created at {self.cache_dir}")
+            # Los ficheros JSON no guardan TTL: purgar solo lo que supera el TTL más largo
+            max_ttl = max([self.default_ttl] + [self.get_ttl(cache_type) for cache_type in CACHE_CONFIG.get('ttl_hours', {})])
+            self.backend = backend or create_cache_backend(
+                CACHE_CONFIG.get('backend', 'sqlite'), self.cache_dir, max_ttl, purge_grace=self.stale_seconds
+            )
+            logging.info(f"Cache backend {type(self.backend).__name__} ready at {self.cache_dir}")
         except Exception as e:
-            logging.error(f"Error creating cache directories: {e}")
+            logging.error(f"Error creating cache backend: {e}")
             raise
-    
-    def get(self, key, cache_type='general', max_age_hours=24):
+
+    @staticmethod
+    def get_ttl(cache_type):
+        """Get the TTL in seconds configured for a cache_type"""
+        if cache_type.startswith(NEGATIVE_PREFIX):
+            return CACHE_CONFIG['negative_ttl_minutes'] * 60
+        hours = CACHE_CONFIG.get('ttl_hours', {}).get(cache_type, CACHE_CONFIG['max_age_hours'])
+        return hours * 3600
+
+    def lookup(self, key, cache_type='general', max_age_hours=None):
+        """Get {'data', 'fetched_at', 'validators', 'fresh'} for a key, including stale entries inside the stale window"""
+        max_age_seconds = max_age_hours * 3600 if max_age_hours is not None else self.get_ttl(cache_type)
+        memory_key = (cache_type, str(key))
+
+        cached = self.memory.get(memory_key)
+        source = 'memory_hits'
+        if cached is None:
+            cached = self._read_backend(key, cache_type, memory_key)
+            source = 'disk_hits'
+        if cached is None:
+            logging.debug(f"Cache miss for {key} in {cache_type}")
+            self._count(cache_type, 'misses')
+            return None
+
+        data, fetched_at, validators = cached
+        age = time.time() - fetched_at
+        if age <= max_age_seconds:
+            self._count(cache_type, source)
+            return {'data': data, 'fetched_at': fetched_at, 'validators': validators, 'fresh': True}
+
+        if age <= max_age_seconds + self.stale_seconds:
+            logging.debug(f"Stale cache entry for {key} in {cache_type}")
+            self._count(cache_type, 'stale_hits')
+            return {'data': data, 'fetched_at': fetched_at, 'validators': validators, 'fresh': False}
+
+        logging.info(f"Cache expired for {key} in {cache_type}")
+        self.delete(key, cache_type)
+        self._count(cache_type, 'misses')
+        return None
+
+    def peek(self, key, cache_type='general'):
+        """Get an entry whatever its age, without expiring it (offline mode)"""
+        memory_key = (cache_type, str(key))
+        cached = self.memory.get(memory_key) or self._read_backend(key, cache_type, memory_key)
+        if cached is None:
+            return None
+        data, fetched_at, validators = cached
+        fresh = time.time() - fetched_at <= self.get_ttl(cache_type)
+        return {'data': data, 'fetched_at': fetched_at, 'validators': validators, 'fresh': fresh}
+
+    def get(self, key, cache_type='general', max_age_hours=None):
         """Get cached data if not expired"""
+        entry = self.lookup(key, cache_type, max_age_hours)
+        return entry['data'] if entry and entry['fresh'] else None
+
+    def _read_backend(self, key, cache_type, memory_key):
+        """Read and decode an entry from the persistent store, promoting it to memory"""
         try:
-            cache_dir = self._get_cache_dir(cache_type)
-            # Sanitizar la key
-            key = str(key).replace('/', '_').replace('\\', '_')
-            cache_file = os.path.join(cache_dir, f"{key}.json")
-            
-            if not os.path.exists(cache_file):
-                logging.debug(f"Cache miss for {key} in {cache_type}")
+            entry = self.backend.get(key, cache_type)
+            if entry is None:
                 return None
-                
-            # Check cache age
-            file_age = datetime.now() - datetime.fromtimestamp(os.path.getmtime(cache_file))
-            if file_age > timedelta(hours=max_age_hours):
-                logging.info(f"Cache expired for {key} in {cache_type}")
-                os.remove(cache_file)
-                return None
-                
             try:
-                with open(cache_file, 'r') as f:
-                    data = json.load(f)
-                    logging.debug(f"Cache hit for {key} in {cache_type}")
-                    return data
+                data = json.loads(entry['payload'])
             except json.JSONDecodeError:
-                logging.warning(f"Corrupted cache file for {key} in {cache_type}")
-                os.remove(cache_file)
+                logging.warning(f"Corrupted cache entry for {key} in {cache_type}")
+                self.backend.delete(key, cache_type)
                 return None
+            validators = entry.get('validators')
+            self.memory.set(memory_key, data, len(entry['payload']), entry['fetched_at'], validators)
+            return data, entry['fetched_at'], validators
         except Exception as e:
             logging.error(f"Error reading cache: {e}")
             return None
     
-    def set(self, key, data, cache_type='general'):
-        """Save data to cache"""
+    def set(self, key, data, cache_type='general', validators=None):
+        """Save data to cache (memory and persistent store) with optional ETag/Last-Modified validators"""
+        memory_key = (cache_type, str(key))
         try:
-            cache_dir = self._get_cache_dir(cache_type)
-            os.makedirs(cache_dir, exist_ok=True)
-            
-            # Sanitizar la key
-            key = str(key).replace('/', '_').replace('\\', '_')
-            cache_file = os.path.join(cache_dir, f"{key}.json")
-            
-            with open(cache_file, 'w') as f:
-                json.dump(data, f)
+            payload = json.dumps(data)
+            fetched_at = time.time()
+            self.backend.set(key, cache_type, payload, fetched_at, self.get_ttl(cache_type), validators)
+            self.memory.set(memory_key, data, len(payload), fetched_at, validators)
             logging.debug(f"Cache set for {key} in {cache_type}")
         except Exception as e:
             logging.error(f"Error writing cache for {key} in {cache_type}: {e}")
-    
-    def _get_cache_dir(self, cache_type):
-        """Get appropriate cache directory based on type"""
-        if cache_type in self.subdirs:
-            return os.path.join(self.cache_dir, self.subdirs[cache_type])
-        return self.cache_dir
+            self.memory.delete(memory_key)
+
+    def touch(self, key, cache_type='general'):
+        """Restart the TTL of an entry confirmed unchanged by a 304 response"""
+        fetched_at = time.time()
+        self.memory.touch((cache_type, str(key)), fetched_at)
+        try:
+            self.backend.touch(key, cache_type, fetched_at)
+        except Exception as e:
+            logging.error(f"Error refreshing cache entry for {key} in {cache_type}: {e}")
+
+    @staticmethod
+    def get_validators(headers):
+        """Extract the ETag/Last-Modified validators from response headers"""
+        validators = {}
+        if headers.get('ETag'):
+            validators['etag'] = headers['ETag']
+        if headers.get('Last-Modified'):
+            validators['last_modified'] = headers['Last-Modified']
+        return validators or None
+
+    @staticmethod
+    def get_conditional_headers(entry):
+        """Build If-None-Match/If-Modified-Since headers to revalidate a cached entry"""
+        validators = (entry or {}).get('validators') or {}
+        headers = {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        return headers or None
+
+    def record_revalidation(self, cache_type, not_modified):
+        """Count a conditional request and whether it was answered with 304"""
+        with self._stats_lock:
+            self.stats[cache_type]['revalidations'] += 1
+            if not_modified:
+                self.stats[cache_type]['not_modified'] += 1
+
+    def set_negative(self, key, cache_type='general', reason='not_found'):
+        """Remember for a short TTL that a key doesn't exist (kept apart from positive entries)"""
+        self.set(key, {'reason': reason}, cache_type=f'{NEGATIVE_PREFIX}{cache_type}')
+
+    def is_negative(self, key, cache_type='general'):
+        """Check whether a key was recently found not to exist"""
+        return self.get(key, cache_type=f'{NEGATIVE_PREFIX}{cache_type}') is not None
+
+    def clear_negative(self, key, cache_type='general'):
+        """Forget a negative entry (e.g. after the record has been created)"""
+        self.delete(key, cache_type=f'{NEGATIVE_PREFIX}{cache_type}')
+
+    def delete(self, key, cache_type='general'):
+        """Remove an entry from memory and the persistent store"""
+        self.memory.delete((cache_type, str(key)))
+        try:
+            self.backend.delete(key, cache_type)
+        except Exception as e:
+            logging.error(f"Error deleting cache entry for {key} in {cache_type}: {e}")
+
+    def refresh_in_background(self, key, cache_type, fetch):
+        """Run fetch() in a background thread to refresh an entry (once per key at a time); fetch stores the result"""
+        refresh_key = (cache_type, str(key))
+        with self._refresh_lock:
+            if refresh_key in self._refreshing:
+                return False
+            self._refreshing.add(refresh_key)
+            if self._refresher is None:
+                self._refresher = ThreadPoolExecutor(
+                    max_workers=CACHE_CONFIG['refresh_workers'], thread_name_prefix='cache-refresh'
+                )
+        self._count(cache_type, 'background_refreshes')
+        self._refresher.submit(self._refresh, key, cache_type, fetch, refresh_key)
+        return True
+
+    def _refresh(self, key, cache_type, fetch, refresh_key):
+        try:
+            fetch()
+        except Exception as e:
+            logging.error(f"Background refresh failed for {key} in {cache_type}: {e}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing.discard(refresh_key)
+
+    def _count(self, cache_type, counter):
+        with self._stats_lock:
+            self.stats[cache_type][counter] += 1
+
+    def get_stats(self):
+        """Get hit/miss counters per cache_type plus memory usage"""
+        with self._stats_lock:
+            by_type = {cache_type: dict(counters) for cache_type, counters in self.stats.items()}
+        for counters in by_type.values():
+            hits = counters['memory_hits'] + counters['disk_hits'] + counters['stale_hits']
+            lookups = hits + counters['misses']
+            counters['hit_ratio'] = hits / lookups if lookups else 0.0
+            counters['revalidation_ratio'] = (
+                counters['not_modified'] / counters['revalidations'] if counters['revalidations'] else 0.0
+            )
+        return {
+            'by_type': by_type,
+            'memory_entries': len(self.memory),
+            'memory_bytes': self.memory.size_bytes
+        }
+
+    def purge_expired(self):
+        """Remove entries past their TTL plus the stale window from the persistent store"""
+        return self.backend.purge_expired(grace=self.stale_seconds)
     
     def clear_cache(self, cache_type=None):
         """Clear all cache or specific cache type"""
-        if cache_type:
-            cache_dir = self._get_cache_dir(cache_type)
-            for file in os.listdir(cache_dir):
-                os.remove(os.path.join(cache_dir, file))
-        else:
-            for directory in [os.path.join(self.cache_dir, 'locations'), os.path.join(self.cache_dir, 'departments'), os.path.join(self.cache_dir, 'assets'), self.cache_dir]:
-                if os.path.exists(directory):
-                    for file in os.listdir(directory):
-                        os.remove(os.path.join(directory, file))
+        self.memory.clear(cache_type)
+        self.backend.clear(cache_type)
@@ -15,8 +15,13 @@ class ComponentManager:
         }
         logger.info("ComponentManager initialized with types: %s", self.component_types)
 
-    def get_components(self, asset_id, join=True, combine_cpu_ram=False, specified_components=None):
-        """Get and process components for an asset"""
+    def fetch_components(self, asset_id):
+        """Fetch the raw components payload for an asset"""
+        return self.api.make_request(f'assets/{asset_id}/components')
+
+    def get_components(self, asset_id, join=True, combine_cpu_ram=False, specified_components=None,
+                       components_data=None):
+        """Get and process components for an asset (reuses components_data if already fetched)"""
         logger.info(f"Getting components for asset {asset_id}")
         
         # Traducir los tipos de componentes especificados
@@ -25,8 +30,8 @@ class ComponentManager:
             logger.debug(f"Looking for component types: {specified_components}")
         
         try:
-            # Obtener componentes de la API
-            components = self.api.make_request(f'assets/{asset_id}/components')
+            # Obtener componentes de la API si no se han obtenido ya
+            components = components_data if components_data is not None else self.fetch_components(asset_id)
             
             if not components or 'components' not in components:
                 logger.warning(f"No components found for asset {asset_id}")
@@ -5,11 +5,67 @@ MAX_RETRIES = 3
 RETRY_DELAY = 5  # seconds
 RATE_LIMIT_DELAY = 60  # seconds
 
+# Client-side rate limiting (token bucket synced with X-Ratelimit-* headers)
+RATE_LIMIT_CONFIG = {
+    'requests_per_minute': 100,          # initial budget until the first response headers arrive
+    'window_seconds': 60,
+    'safety_margin': 5                   # requests kept in reserve for other clients using the same key
+}
+
+# HTTP connection pool settings
+HTTP_CONFIG = {
+    'pool_connections': 4,      # number of host pools kept
+    'pool_maxsize': 16,         # connections kept alive per host
+    'pool_block': True,         # wait for a free connection instead of opening extra ones
+    'keep_alive': True,
+    'timeout': 30,              # seconds
+    'transport_retries': 3,     # retries for connection errors and 5xx responses
+    'backoff_factor': 0.5,
+    'status_forcelist': [500, 502, 503, 504]
+}
+
+# Pagination of list endpoints
+PAGINATION_CONFIG = {
+    'per_page': 100,        # máximo permitido por la API
+    'parallel': True,       # False = comportamiento en serie página a página
+    'speculative': True,    # sin total conocido, pedir ventanas de páginas en paralelo
+    'max_workers': 4,
+    'read_ahead': 2         # páginas precargadas por iter_pages/iter_items (0 = sin precarga)
+}
+
+# Concurrent asset processing
+CONCURRENCY_CONFIG = {
+    'default_workers': 1,   # 1 = procesamiento secuencial
+    'max_workers': 16       # no superar HTTP_CONFIG['pool_maxsize']
+}
+
+# Read-ahead pipeline for sequential runs (-w 1)
+PIPELINE_CONFIG = {
+    'read_ahead': 4     # assets precargados por delante del que se procesa (0 = sin precarga)
+}
+
+# Checkpoint journal of CLI runs (fstools.py --resume <run-id>)
+RUN_JOURNAL_CONFIG = {
+    'enabled': True,
+    'directory': 'runs',    # dentro de CACHE_DIR, un fichero .jsonl por ejecución
+    'fsync_every': 50,      # assets escritos entre cada fsync
+    'max_age_days': 14,     # al empezar una ejecución se borran los journals más antiguos...
+    'max_runs': 50          # ...y los que pasen de este número (los más recientes se conservan)
+}
+
+# asyncio engine (AsyncFreshServiceAPI)
+ASYNC_CONFIG = {
+    'enabled': False,           # motor asyncio por defecto en process_assets (opcional: los hilos cubren --workers, --read-ahead y offline)
+    'max_concurrency': 50,      # peticiones HTTP en vuelo
+    'keepalive_timeout': 30     # seconds
+}
+
 # Export settings
 EXCEL_SETTINGS = {
     'header_color': '003366',
     'row_color': 'D9E1F2',
-    'max_column_width': 50
+    'max_column_width': 50,
+    'width_sample_rows': 10000      # con más filas, los anchos se calculan sobre una muestra
 }
 
 # Default column order for exports
@@ -33,17 +89,68 @@ COMPONENT_TYPES = {
     'nic': 'Network Adapter'
 }
 
+# type_fields keys for the per-asset information options (include_<field>)
+ASSET_TYPE_FIELDS = {
+    'system_os': 'os_23001176139',
+    'machine_ip': 'computer_ip_address_23001176139',
+    'machine_mac': 'mac_address_23001176139',
+    'serial_number': 'serial_number_23001176134'
+}
+
+# Run-scoped reference data (departments, locations, asset types)
+REFERENCE_DATA_CONFIG = {
+    'max_age_seconds': 3600,        # recargar en la siguiente ejecución si son más antiguos
+    'refresh_min_interval': 300,    # recargas como mucho cada N segundos al ver un ID desconocido
+    'full_reload_hours': 24,        # descarga completa como mucho cada N horas; entre medias solo los cambios
+    'delta_queries': {              # filtro de cambios recientes (las colecciones pequeñas se descargan enteras)
+        'requesters': "updated_at:>'{since}'"
+    }
+}
+
+# Local asset mirror (fstools.py --sync)
+MIRROR_CONFIG = {
+    'enabled': True,
+    'filename': 'mirror.sqlite3',   # dentro de CACHE_DIR
+    'max_staleness_hours': 12,      # más antiguo que esto: volver a la API
+    'sync_components': True,
+    'sync_workers': 8,
+    'batch_size': 500
+}
+
+# Existence pre-pass: skip display_ids that don't exist before fetching them one by one
+EXISTENCE_CONFIG = {
+    'enabled': True,
+    'min_ids': 200,             # con menos IDs no compensa listar el inventario
+    'max_listing_ratio': 0.25,  # el listado no puede costar más peticiones que esta fracción de los IDs
+    'max_age_seconds': 600      # reutilizar el listado entre ejecuciones de la misma sesión (web)
+}
+
 # Cache settings
 CACHE_CONFIG = {
     'enabled': True,
-    'max_age_hours': 24,
+    'backend': 'sqlite',                    # 'sqlite' (.cache/cache.sqlite3) o 'json' (un fichero por key)
+    'max_age_hours': 24,                    # TTL por defecto de los tipos sin entrada en ttl_hours
+    'ttl_hours': {
+        'asset_types': 168,
+        'departments': 24,
+        'locations': 24,
+        'requesters': 12,
+        'general': 24
+    },
+    'stale_while_revalidate': True,         # servir entradas caducadas y refrescarlas en segundo plano
+    'stale_max_hours': 72,                  # edad máxima tras el TTL para seguir sirviendo una entrada
+    'refresh_workers': 2,
+    'negative_ttl_minutes': 60,             # 404 y búsquedas sin resultados (caché negativa)
+    'memory_max_entries': 5000,             # LRU en memoria delante del disco
+    'memory_max_bytes': 32 * 1024 * 1024,   # tamaño aproximado (JSON serializado)
     'excluded_endpoints': ['assets']  # endpoints that shouldn't be cached
 }
 
 # Export settings
 EXPORT_CONFIG = {
     'default_format': 'xlsx',
-    'allowed_formats': ['xlsx', 'csv', 'json'],
+    'allowed_formats': ['xlsx', 'csv', 'json', 'ndjson', 'parquet'],
+    'parquet_row_group_size': 50000,    # filas por row group (pyarrow)
     'excel': {
         'date_format': 'DD/MM/YYYY',
         'freeze_panes': True,
@@ -1,3 +1,5 @@
+from .data_processor import render_table
+
 class DataExporter:
     def __init__(self, excel_manager):
         self.excel_manager = excel_manager
@@ -39,7 +41,7 @@ class DataExporter:
             # Imprimir información detallada
             print(f"{Fore.CYAN}[INFO] Exportando {len(df)} filas a {options.get('output')}{Style.RESET_ALL}")
             print(f"{Fore.CYAN}[INFO] Primeras filas del DataFrame:{Style.RESET_ALL}")
-            print(df.head().to_string())
+            print(render_table(df.head()))
             
             # Exportar datos a Excel
             result = self.excel_manager.export_to_excel(df, options['output'])
@@ -53,7 +55,7 @@ class DataExporter:
             
             # Mostrar en consola si es verbose
             if options.get('verbose'):
-                print(df)
+                print(render_table(df))
                 
             return True
             
@@ -1,8 +1,43 @@
 import pandas as pd
 import logging
+from .config import EXCEL_SETTINGS
 
 logger = logging.getLogger(__name__)
 
+def compute_column_widths(df, max_width=None, padding=3, sample_size=None):
+    """Get {column: width} from the longest header or value, using vectorized string lengths"""
+    if max_width is None:
+        max_width = EXCEL_SETTINGS['max_column_width']
+    if sample_size is None:
+        sample_size = EXCEL_SETTINGS['width_sample_rows']
+    if sample_size and len(df) > sample_size:
+        # Muestra reproducible: mismo fichero, mismos anchos
+        df = df.sample(sample_size, random_state=0)
+
+    widths = {}
+    for index, column in enumerate(df.columns):
+        values = df.iloc[:, index]
+        values = values[values.notna()]
+        longest = values.astype(str).str.len().max() if len(values) else 0
+        widths[column] = min(max(len(str(column)), int(longest or 0)) + padding, max_width)
+    return widths
+
+def render_table(df, widths=None, max_width=40, max_rows=None):
+    """Render a DataFrame for the console with columns cut to the shared width metadata"""
+    if widths is None:
+        widths = compute_column_widths(df, max_width=max_width, padding=0)
+
+    def fit(width):
+        def format_value(value):
+            text = '' if value is None or value != value else str(value)
+            return text if len(text) <= width else text[:width - 1] + '…'
+        return format_value
+
+    formatters = {column: fit(widths[column]) for column in df.columns if column in widths}
+    if max_rows is None:
+        max_rows = pd.get_option('display.max_rows')
+    return df.to_string(index=False, formatters=formatters, max_rows=max_rows, na_rep='')
+
 class DataProcessor:
     def process_dataframe(self, data):
         """Convert data to DataFrame"""
@@ -1,7 +1,108 @@
+import math
+from itertools import chain, islice
 import openpyxl
-from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.formatting.rule import FormulaRule
+from openpyxl.styles import Alignment, Font, NamedStyle, PatternFill
+from openpyxl.utils import get_column_letter
 import os
 from colorama import Fore, Style, init
+from .config import EXCEL_SETTINGS, EXPORT_CONFIG
+from .data_processor import compute_column_widths
+from .row_spool import RowSpool
+
+HEADER_STYLE_NAME = 'fs_header'
+
+def register_header_style(wb, header_fill=None, header_font=None):
+    """Add the header named style to a workbook once; cells then reference it by name"""
+    if HEADER_STYLE_NAME not in wb.named_styles:
+        color = EXCEL_SETTINGS['header_color']
+        wb.add_named_style(NamedStyle(
+            name=HEADER_STYLE_NAME,
+            fill=header_fill or PatternFill(start_color=color, end_color=color, fill_type='solid'),
+            font=header_font or Font(color='FFFFFF', bold=True),
+            alignment=Alignment(horizontal='center', vertical='center')
+        ))
+    return HEADER_STYLE_NAME
+
+def add_row_banding(ws, last_column, last_row, row_fill=None):
+    """Shade every other data row with one conditional-formatting rule instead of a fill per cell"""
+    if last_column < 1 or last_row < 2:
+        return
+    color = EXCEL_SETTINGS['row_color']
+    row_fill = row_fill or PatternFill(start_color=color, end_color=color, fill_type='solid')
+    # Las filas pares (2, 4, ...) llevan fondo, igual que antes con las celdas rellenas una a una
+    ws.conditional_formatting.add(
+        f"A2:{get_column_letter(last_column)}{last_row}",
+        FormulaRule(formula=['MOD(ROW(),2)=0'], fill=row_fill)
+    )
+
+class StreamingExcelWriter:
+    """Single-pass xlsx writer (openpyxl write-only mode): header style, banding, freeze panes and widths applied while rows stream"""
+
+    def __init__(self, output_file, columns, widths=None, sheet_title='Sheet1'):
+        self.output_file = output_file
+        self.columns = list(columns)
+        self.rows_written = 0
+        self.wb = openpyxl.Workbook(write_only=True)
+        self.ws = self.wb.create_sheet(title=sheet_title)
+
+        # En modo write-only anchos y paneles se fijan antes de la primera fila
+        for index, width in enumerate(widths or [], start=1):
+            self.ws.column_dimensions[get_column_letter(index)].width = width
+        if EXPORT_CONFIG['excel']['freeze_panes']:
+            self.ws.freeze_panes = 'A2'
+
+        self._header_style = register_header_style(self.wb)
+        self._write_header()
+
+    def _write_header(self):
+        header = []
+        for column in self.columns:
+            cell = WriteOnlyCell(self.ws, value=str(column))
+            cell.style = self._header_style
+            header.append(cell)
+        self.ws.append(header)
+
+    @staticmethod
+    def _to_cell_value(value):
+        """Convert a value to something openpyxl can write (NaN -> empty, dicts/lists -> text)"""
+        if value is None or isinstance(value, (str, int, bool)):
+            return value
+        if isinstance(value, float):
+            return None if math.isnan(value) else value
+        if isinstance(value, (dict, list, tuple, set)):
+            return str(value)
+        try:
+            import pandas as pd
+            if pd.isna(value):
+                return None
+        except (TypeError, ValueError):
+            pass
+        return value if hasattr(value, 'year') else str(value)
+
+    def write_row(self, values):
+        """Append a row of values in column order (unstyled: banding is a single range rule)"""
+        self.ws.append([self._to_cell_value(value) for value in values])
+        self.rows_written += 1
+
+    def write_rows(self, rows):
+        for values in rows:
+            self.write_row(values)
+
+    def close(self):
+        add_row_banding(self.ws, len(self.columns), self.rows_written + 1)
+        if EXPORT_CONFIG['excel']['auto_filter'] and self.columns:
+            self.ws.auto_filter.ref = f"A1:{get_column_letter(len(self.columns))}{self.rows_written + 1}"
+        self.wb.save(self.output_file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        return False
 
 class ExcelManager:
     def __init__(self):
@@ -43,10 +144,9 @@ class ExcelManager:
             output_file = self._get_unique_filename(output_file)
             print(f"{Fore.CYAN}[INFO] Exportando a archivo: {output_file}{Style.RESET_ALL}")
             
-            # Export to Excel - antes de exportar, hacer una copia del DataFrame
-            # para evitar modificarlo y evitar problemas de referencias
+            # El escritor en streaming no modifica el DataFrame: no hace falta copiarlo
             import pandas as pd
-            export_df = pd.DataFrame(df).copy()
+            export_df = pd.DataFrame(df)
             
             # Print DataFrame info para diagnóstico
             print(f"{Fore.CYAN}[INFO] Información del DataFrame:{Style.RESET_ALL}")
@@ -54,36 +154,17 @@ class ExcelManager:
             print(f"{Fore.CYAN}  - Columnas: {len(export_df.columns)}{Style.RESET_ALL}")
             print(f"{Fore.CYAN}  - Tipos de datos: {export_df.dtypes.to_dict()}{Style.RESET_ALL}")
             
-            # Exportar
-            export_df.to_excel(output_file, index=False)
+            # Exportar en una sola pasada: el formato se aplica mientras se escriben las filas
+            if output_file.endswith('.xlsx'):
+                self.write_dataframe(export_df, output_file)
+            else:
+                export_df.to_excel(output_file, index=False)
             
             # Verificar que el archivo se haya creado y mostrar su tamaño
             if not os.path.exists(output_file):
                 print(f"{Fore.RED}[ERROR] El archivo {output_file} no se creó correctamente{Style.RESET_ALL}")
                 return False
             
-            # Mostrar tamaño del archivo inicial
-            file_size = self._get_file_size(output_file)
-            print(f"{Fore.CYAN}[INFO] Archivo creado - Tamaño inicial: {file_size}{Style.RESET_ALL}")
-                
-            # Apply formatting
-            if output_file.endswith('.xlsx'):
-                try:
-                    print(f"{Fore.CYAN}[INFO] Aplicando formato al archivo Excel...{Style.RESET_ALL}")
-                    self.format_excel_file(output_file)
-                    
-                    # Mostrar tamaño del archivo después del formateo
-                    new_file_size = self._get_file_size(output_file)
-                    print(f"{Fore.CYAN}[INFO] Formato aplicado - Tamaño después de formateo: {new_file_size}{Style.RESET_ALL}")
-                    
-                    # Mostrar cambio en el tamaño
-                    if file_size != new_file_size:
-                        print(f"{Fore.CYAN}[INFO] Cambio en tamaño de archivo: {file_size} → {new_file_size}{Style.RESET_ALL}")
-                    
-                except Exception as e:
-                    print(f"{Fore.YELLOW}[ADVERTENCIA] Error al formatear Excel (no crítico): {str(e)}{Style.RESET_ALL}")
-                    # Continuar aunque el formateo falle
-            
             # Verificación final del archivo
             if os.path.exists(output_file):
                 final_size = self._get_file_size(output_file)
@@ -107,6 +188,38 @@ class ExcelManager:
             print(f"{Fore.RED}[ERROR] Detalle del error:\n{traceback.format_exc()}{Style.RESET_ALL}")
             return False
 
+    def write_dataframe(self, df, output_file):
+        """Write a DataFrame to a formatted xlsx file in a single streaming pass"""
+        columns = [str(column) for column in df.columns]
+        with StreamingExcelWriter(output_file, columns, widths=self.estimate_column_widths(df)) as writer:
+            writer.write_rows(df.itertuples(index=False, name=None))
+        return writer.rows_written
+
+    def write_rows(self, rows, output_file, columns=None, sample_size=1000):
+        """Write an iterable of dicts to a formatted xlsx file without holding them all in memory"""
+        import pandas as pd
+        if columns is not None:
+            rows = iter(rows)
+            sample = [row for _, row in zip(range(sample_size), rows)]
+            return self._write_rows(chain(sample, rows), output_file, columns, pd.DataFrame(sample, columns=columns))
+
+        # En write-only la cabecera va primero: volcar las filas para conocer todas las columnas
+        with RowSpool.for_output(output_file).write_all(rows) as spool:
+            columns = spool.get_columns()
+            sample = pd.DataFrame(list(islice(spool, sample_size)), columns=columns)
+            return self._write_rows(spool, output_file, columns, sample)
+
+    def _write_rows(self, rows, output_file, columns, sample):
+        # Los anchos salen de las primeras filas
+        with StreamingExcelWriter(output_file, columns, widths=self.estimate_column_widths(sample)) as writer:
+            for row in rows:
+                writer.write_row([row.get(column) for column in columns])
+        return writer.rows_written
+
+    def estimate_column_widths(self, df):
+        """Get the width of each column, in order, from the DataFrame (capped at max_column_width)"""
+        return list(compute_column_widths(df).values())
+
     def _get_unique_filename(self, output_file):
         """Ensure the filename is unique by adding a numeric suffix if needed"""
         if not os.path.exists(output_file):
@@ -119,8 +232,8 @@ class ExcelManager:
             counter += 1
         return f"{base}_{counter}{ext}"
 
-    def format_excel_file(self, file_path):
-        """Apply formatting to Excel file"""
+    def format_excel_file(self, file_path, widths=None):
+        """Apply formatting to Excel file (widths: per-column list, computed from the sheet if missing)"""
         # Tamaño antes de formatear
         initial_size = self._get_file_size(file_path)
         print(f"{Fore.CYAN}[INFO] Iniciando formateo - Tamaño actual: {initial_size}{Style.RESET_ALL}")
@@ -136,7 +249,7 @@ class ExcelManager:
         
         # Aplicar formato automático a columnas
         print(f"{Fore.CYAN}[INFO] Ajustando ancho de columnas...{Style.RESET_ALL}")
-        self._auto_adjust_columns(ws)
+        self._auto_adjust_columns(ws, widths)
         
         # Aplicar estilos mejorados
         print(f"{Fore.CYAN}[INFO] Aplicando estilos a encabezados...{Style.RESET_ALL}")
@@ -154,43 +267,32 @@ class ExcelManager:
         
         return True
 
-    def _auto_adjust_columns(self, ws):
-        """Auto-adjust column widths"""
+    def _auto_adjust_columns(self, ws, widths=None):
+        """Set column widths, computing them from the sheet values in one vectorized pass if not given"""
+        if widths is None:
+            import pandas as pd
+            rows = ws.iter_rows(values_only=True)
+            header = next(rows, ())
+            widths = self.estimate_column_widths(pd.DataFrame(rows, columns=list(header)))
         column_count = 0
-        for col in ws.columns:
+        for index, width in enumerate(widths, start=1):
             column_count += 1
-            max_length = 0
-            col_letter = col[0].column_letter
-            for cell in col:
-                try:
-                    if cell.value:
-                        max_length = max(max_length, len(str(cell.value)))
-                except:
-                    pass
-            adjusted_width = min(max_length + 3, 50)  # Cap width at 50
-            ws.column_dimensions[col_letter].width = adjusted_width
+            ws.column_dimensions[get_column_letter(index)].width = width
         
         print(f"{Fore.CYAN}[INFO] Ajustadas {column_count} columnas en el Excel{Style.RESET_ALL}")
             
     def _apply_header_styles(self, ws, header_fill, header_font):
-        """Apply styles to header row"""
+        """Apply the header named style to the header row"""
+        header_style = register_header_style(ws.parent, header_fill, header_font)
         header_count = 0
         for cell in ws[1]:
             header_count += 1
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center')
+            cell.style = header_style
         
         print(f"{Fore.CYAN}[INFO] Aplicado estilo a {header_count} celdas de encabezado{Style.RESET_ALL}")
             
     def _apply_row_styles(self, ws, row_fill):
-        """Apply alternating row styles"""
-        styled_rows = 0
-        for row_idx, row in enumerate(ws.iter_rows(min_row=2)):
-            # Aplicar estilo alternado a filas
-            if row_idx % 2 == 0:
-                styled_rows += 1
-                for cell in row:
-                    cell.fill = row_fill
-                    
+        """Apply alternating row styles with a conditional-formatting range"""
+        add_row_banding(ws, ws.max_column, ws.max_row, row_fill)
+        styled_rows = ws.max_row // 2
         print(f"{Fore.CYAN}[INFO] Aplicado estilo a {styled_rows} filas de datos{Style.RESET_ALL}")
\ No newline at end of file
@@ -1,37 +1,203 @@
+import csv
+import gzip
 import json
+import logging
+import os
+import shutil
+import tempfile
+from itertools import islice
 import pandas as pd
 from .config import EXPORT_CONFIG
+from .excel_manager import ExcelManager
+from .row_spool import RowSpool
+
+logger = logging.getLogger(__name__)
 
 class ExportManager:
-    def export_data(self, data, output_file, format=None):
-        if not format:
-            format = EXPORT_CONFIG['default_format']
-            
+    # Extensión del fichero de salida -> formato (.gz se ignora: indica compresión)
+    EXTENSIONS = {
+        '.xlsx': 'xlsx',
+        '.csv': 'csv',
+        '.json': 'json',
+        '.ndjson': 'ndjson',
+        '.jsonl': 'ndjson',
+        '.parquet': 'parquet'
+    }
+
+    # Formatos que admiten compresión gzip
+    TEXT_FORMATS = ('csv', 'json', 'ndjson')
+
+    def detect_format(self, output_file):
+        """Guess the export format from the file extension (file.csv.gz is csv)"""
+        name = (output_file or '').lower()
+        if name.endswith('.gz'):
+            name = name[:-3]
+        return self.EXTENSIONS.get(os.path.splitext(name)[1], EXPORT_CONFIG['default_format'])
+
+    def check_format(self, format):
+        """Fail early if a format is unknown or its optional dependency is missing"""
         if format not in EXPORT_CONFIG['allowed_formats']:
             raise ValueError(f"Unsupported format: {format}")
-            
+        if format == 'parquet':
+            self._import_pyarrow()
+
+    @staticmethod
+    def _import_pyarrow():
+        # Importación diferida: pyarrow solo es necesario para exportar a Parquet
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow (pip install pyarrow)")
+        return pa, pq
+
+    def export_data(self, data, output_file, format=None, compress=False):
+        """Export rows (a list, a DataFrame or any iterator of dicts); returns (rows written, path written)"""
+        if not format:
+            format = self.detect_format(output_file)
+
+        self.check_format(format)
+
+        if compress and format in self.TEXT_FORMATS and not output_file.endswith('.gz'):
+            output_file = f'{output_file}.gz'
+        if isinstance(data, pd.DataFrame) and format != 'xlsx':
+            data = data.to_dict('records')
+
         method_name = f"_export_to_{format}"
         export_method = getattr(self, method_name)
-        return export_method(data, output_file)
-        
+        return export_method(data, output_file), output_file
+
+    @staticmethod
+    def _open_text(output_file):
+        """Open a text file for writing, gzip-compressed if it ends in .gz"""
+        if output_file.endswith('.gz'):
+            return gzip.open(output_file, 'wt', encoding='utf-8', newline='')
+        return open(output_file, 'w', encoding='utf-8', newline='')
+
+    @staticmethod
+    def _iter_chunks(rows, size):
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, size))
+            if not chunk:
+                return
+            yield chunk
+
+    @staticmethod
+    def _flatten_row(row):
+        """Flatten nested dicts (user -> user_first_name, ...) and turn lists into text for tabular formats"""
+        flat = {}
+        for key, value in row.items():
+            if isinstance(value, dict):
+                for sub_key, sub_value in value.items():
+                    flat[f'{key}_{sub_key}'] = sub_value if not isinstance(sub_value, (dict, list)) else str(sub_value)
+            elif isinstance(value, (list, tuple, set)):
+                flat[key] = ', '.join(str(item) for item in value)
+            else:
+                flat[key] = value
+        return flat
+
+    def _spool(self, data, output_file, track_types=False):
+        """Flatten the rows into a temporary spool so the full column set is known before writing the header"""
+        return RowSpool.for_output(output_file, track_types).write_all(self._flatten_row(row) for row in data)
+
     def _export_to_xlsx(self, data, output_file):
-        df = pd.DataFrame(data)
-        writer = pd.ExcelWriter(output_file, engine='openpyxl')
-        
-        df.to_excel(writer, index=False)
-        
-        if EXPORT_CONFIG['excel']['freeze_panes']:
-            writer.sheets['Sheet1'].freeze_panes = 'A2'
-            
-        if EXPORT_CONFIG['excel']['auto_filter']:
-            writer.sheets['Sheet1'].auto_filter.ref = writer.sheets['Sheet1'].dimensions
-            
-        writer.save()
-        
+        # Una sola pasada en modo write-only; freeze_panes y auto_filter según EXPORT_CONFIG['excel']
+        excel_manager = ExcelManager()
+        if isinstance(data, pd.DataFrame):
+            return excel_manager.write_dataframe(data, output_file)
+        return excel_manager.write_rows((self._flatten_row(row) for row in data), output_file)
+
     def _export_to_csv(self, data, output_file):
-        df = pd.DataFrame(data)
-        df.to_csv(output_file, index=False)
-        
+        # El cuerpo va a un temporal y la cabecera se escribe al final con todas las columnas
+        # (user_*, componentes... pueden aparecer tarde); solo se reescriben filas si la hubo
+        columns = {}
+        written = 0
+        with tempfile.TemporaryFile('w+', encoding='utf-8', newline='',
+                                    dir=os.path.dirname(os.path.abspath(output_file))) as body:
+            body_writer = csv.writer(body)
+            first_width = None
+            for row in data:
+                row = self._flatten_row(row)
+                for key in row:
+                    if key not in columns:
+                        columns[key] = len(columns)
+                if first_width is None:
+                    first_width = len(columns)
+                body_writer.writerow([row.get(column, '') for column in columns])
+                written += 1
+
+            body.seek(0)
+            with self._open_text(output_file) as f:
+                if columns:
+                    csv.writer(f).writerow(columns)
+                if len(columns) == first_width or not written:
+                    shutil.copyfileobj(body, f)
+                else:
+                    # Las filas anteriores a una columna nueva se completan con celdas vacías
+                    padding = [''] * len(columns)
+                    writer = csv.writer(f)
+                    for values in csv.reader(body):
+                        writer.writerow(values + padding[len(values):])
+        return written
+
     def _export_to_json(self, data, output_file):
-        with open(output_file, 'w') as f:
-            json.dump(data, f, indent=2)
+        # Array JSON escrito elemento a elemento
+        written = 0
+        with self._open_text(output_file) as f:
+            f.write('[')
+            for row in data:
+                f.write(',\n' if written else '\n')
+                f.write(json.dumps(row, indent=2, default=str, ensure_ascii=False))
+                written += 1
+            f.write('\n]\n')
+        return written
+
+    def _export_to_ndjson(self, data, output_file):
+        written = 0
+        with self._open_text(output_file) as f:
+            for row in data:
+                f.write(json.dumps(row, default=str, ensure_ascii=False) + '\n')
+                written += 1
+        return written
+
+    @staticmethod
+    def _get_parquet_type(pa, types):
+        """Column type from the Python types seen in it: mixed or unknown columns are stored as text"""
+        if types and types <= {bool}:
+            return pa.bool_()
+        if types and types <= {int}:
+            return pa.int64()
+        if types and types <= {int, float}:
+            return pa.float64()
+        return pa.string()
+
+    @staticmethod
+    def _coerce(value, arrow_type, pa):
+        if value is None:
+            return None
+        if pa.types.is_string(arrow_type):
+            return value if isinstance(value, str) else str(value)
+        if pa.types.is_floating(arrow_type):
+            return float(value)
+        return value
+
+    def _export_to_parquet(self, data, output_file):
+        pa, pq = self._import_pyarrow()
+
+        # El esquema sale de todas las filas: columnas tardías y tipos mezclados no cortan la exportación
+        with self._spool(data, output_file, track_types=True) as spool:
+            if not spool.count:
+                return 0
+            schema = pa.schema([
+                pa.field(column, self._get_parquet_type(pa, types)) for column, types in spool.columns.items()
+            ])
+            with pq.ParquetWriter(output_file, schema) as writer:
+                for chunk in self._iter_chunks(spool, EXPORT_CONFIG['parquet_row_group_size']):
+                    table = pa.Table.from_pylist([
+                        {field.name: self._coerce(row.get(field.name), field.type, pa) for field in schema}
+                        for row in chunk
+                    ], schema=schema)
+                    # Un row group por bloque
+                    writer.write_table(table, row_group_size=len(chunk))
+            return spool.count
@@ -7,8 +7,11 @@ from .asset_manager import AssetManager
 from .excel_manager import ExcelManager
 from .data_processor import DataProcessor
 from .data_exporter import DataExporter
+from .export_manager import ExportManager
 from .search_manager import SearchManager
 from .location_manager import LocationManager
+from .run_journal import RunJournal
+from .config import RUN_JOURNAL_CONFIG
 import os
 
 class FreshServiceManager:
@@ -18,6 +21,7 @@ class FreshServiceManager:
         self.excel_manager = ExcelManager()
         self.data_processor = DataProcessor()
         self.data_exporter = DataExporter(self.excel_manager)
+        self.export_manager = ExportManager()
         self.search_manager = SearchManager(self.asset_manager)
         self.location_manager = LocationManager(self.asset_manager)  # Add this line
         self._setup_logging()
@@ -36,19 +40,92 @@ class FreshServiceManager:
 
     def run(self, options):
         """Main execution logic with logging"""
+        if options.get('output'):
+            # Antes de gastar llamadas a la API: formato válido y dependencias disponibles
+            self.export_manager.check_format(self._get_export_format(options))
+        journal = self._open_journal(options)
+        if journal is not None:
+            return self._run_with_journal(journal)
+
         logging.info(f"Starting execution with options: {options}")
         asset_ids = self.asset_manager.process_asset_ids(options['ids'], options['exclude'])
         if not asset_ids:
             print(f"{Fore.RED}Error: No valid IDs found in provided input.")
             return
 
-        data = []
-        for asset_id in asset_ids:
-            # Usar el método público process_asset en lugar del privado
-            asset_data = self.asset_manager.process_asset(asset_id, options)
-            if asset_data:
-                data.append(asset_data)
+        # Las filas llegan en el orden de entrada y respetan options['workers']
+        rows = self.asset_manager.iter_process_assets(asset_ids, options)
+        self._report_data(rows, options)
+
+    def _open_journal(self, options):
+        """Start a new run journal, or reopen the one named by options['resume']"""
+        run_id = options.get('resume')
+        if not run_id:
+            return RunJournal.create(options) if RUN_JOURNAL_CONFIG['enabled'] else None
+
+        try:
+            journal = RunJournal.load(run_id)
+        except (FileNotFoundError, ValueError) as e:
+            raise ValueError(f"Can't resume run {run_id}: {e}")
+        # Los IDs y opciones de la ejecución original mandan; la salida y la presentación se pueden cambiar
+        for key in ('output', 'format', 'gzip', 'verbose', 'workers', 'async_concurrency', 'read_ahead'):
+            if options.get(key) is not None:
+                journal.options[key] = options[key]
+        return journal
+
+    def _run_with_journal(self, journal):
+        """Process the pending IDs of a run, checkpointing each asset, and export from the journal"""
+        options = journal.options
+        logging.info(f"Starting run {journal.run_id} with options: {options}")
+        asset_ids = self.asset_manager.process_asset_ids(options['ids'], options['exclude'])
+        if not asset_ids:
+            print(f"{Fore.RED}Error: No valid IDs found in provided input.")
+            return
+
+        pending = asset_ids - journal.finished_ids
+        if journal.finished_ids or journal.failed_ids:
+            retried = len(journal.failed_ids & pending)
+            print(f"{Fore.CYAN}Resuming run {journal.run_id}: {len(asset_ids) - len(pending)} assets already done, "
+                  f"{len(pending)} pending ({retried} failed before and retried)")
+        else:
+            print(f"{Fore.CYAN}Run ID: {journal.run_id} (resume with --resume {journal.run_id})")
 
+        try:
+            if pending:
+                # Las filas ya quedan en el journal: no hace falta acumularlas aquí
+                for _ in self.asset_manager.iter_process_assets(pending, options, journal=journal):
+                    pass
+            self._report_data(journal.iter_data(), options)
+            journal.mark_completed(options.get('output'))
+            if journal.failed_count:
+                print(f"{Fore.YELLOW}{journal.failed_count} assets failed (network errors or rate limit); "
+                      f"retry them with: --resume {journal.run_id}")
+        except BaseException:
+            print(f"{Fore.YELLOW}Run interrupted, resume it with: --resume {journal.run_id}")
+            raise
+        finally:
+            journal.close()
+
+    def _get_export_format(self, options):
+        """Get the export format from --format or the output file extension"""
+        return options.get('format') or self.export_manager.detect_format(options.get('output'))
+
+    def _report_data(self, rows, options):
+        """Export the processed rows or report that there were none"""
+        export_format = self._get_export_format(options)
+        if options.get('output') and export_format != 'xlsx':
+            # Formatos en streaming: las filas se escriben según llegan, en memoria constante
+            # Con --gzip el fichero escrito es <output>.gz
+            count, written_file = self.export_manager.export_data(rows, options['output'], export_format, options.get('gzip'))
+            if count:
+                print(f"{Fore.GREEN}Successfully exported {count} entries to {written_file} ({export_format})")
+                logging.info(f"Exported {count} entries as {export_format}")
+            else:
+                print(f"{Fore.YELLOW}No data obtained")
+                logging.warning("No data obtained")
+            return
+
+        data = list(rows)
         if data:
             print(f"{Fore.GREEN}Successfully processed {len(data)} entries")
             logging.info(f"Successfully processed {len(data)} entries")
@@ -63,6 +140,28 @@ class FreshServiceManager:
         if df is not None:
             self.data_exporter.export_data(df, options)
 
+    def set_offline(self, enabled=True):
+        """Serve every request from the cache and the local mirror only"""
+        self.asset_manager.set_offline(enabled)
+
+    def get_offline_report(self, reset=True):
+        """Get one line per field with missing or stale data since the last reset (offline mode)"""
+        report = self.asset_manager.offline_report
+        lines = report.summary()
+        logging.info(f"Offline report: {report.to_dict()}")
+        if reset:
+            report.reset()
+        return lines
+
+    def sync_mirror(self, full=False):
+        """Sync the local asset mirror and report what changed"""
+        logging.info(f"Starting mirror sync (full={full})")
+        result = self.asset_manager.sync_mirror(full=full)
+        print(f"{Fore.GREEN}✓ Mirror {result['mode']} sync: {result['assets_synced']} assets updated, "
+              f"{result['total_assets']} in mirror ({result['elapsed']:.1f}s)")
+        logging.info(f"Mirror sync result: {result}")
+        return result
+
     def list_departments(self):
         """List all departments"""
         logger.info("Requesting department list")
@@ -82,35 +181,23 @@ class FreshServiceManager:
         return self.location_manager.format_location_tree()
 
     def search_by_user(self, full_name, output_file=None):
-        """Search assets by user name"""
-        try:
-            first_name, last_name = full_name.split(' ', 1)
-        except ValueError:
-            return None, "Error: Full name must include first and last name"
+        """Search assets by user name (accent-insensitive, tolerant to typos and partial names)"""
+        if not full_name or not full_name.strip():
+            return None, "Error: A user name is required"
 
-        user = self.asset_manager.get_user_by_name(first_name, last_name)
+        user = self.asset_manager.find_user(full_name)
         if not user:
             return None, "User not found"
 
-        assets = self.asset_manager.get_assets_by_user(user['id'])
-        if not assets:
+        processed_data = self._collect_search_results(
+            self.asset_manager.iter_assets_by_user(user['id']),
+            ('Department', 'Location', 'Type'),
+            output_file
+        )
+        if not processed_data:
             return None, "No assets found for this user"
             
-        processed_data = []
-        for asset in assets:
-            processed_data.append({
-                'Asset ID': asset.get('display_id'),
-                'Name': asset.get('name'),
-                'Department': self.asset_manager._get_department_name(asset),
-                'Location': self.asset_manager._get_location_name(asset),
-                'Type': self.asset_manager._get_asset_type(asset),
-                'State': asset.get('asset_state')
-            })
-
-        if output_file:
-            self.search_manager.export_results(assets, output_file)
-            
-        return processed_data, f"Assets found for {first_name} {last_name}"
+        return processed_data, f"Assets found for {user.get('first_name', '')} {user.get('last_name', '')}".rstrip()
 
     def search_by_department(self, department_name, output_file=None):
         """Search assets by department"""
@@ -122,30 +209,17 @@ class FreshServiceManager:
             return None, "Department not found"
             
         logger.info(f"Found department ID: {dept_id}")
-        assets = self.asset_manager.get_assets_by_department(dept_id)
+        processed_data = self._collect_search_results(
+            self.asset_manager.iter_assets_by_department(dept_id),
+            ('Location', 'Type'),
+            output_file
+        )
         
-        if not assets:
+        if not processed_data:
             logger.info(f"No assets found in department {department_name}")
             return None, "No assets found in this department"
             
-        logger.info(f"Found {len(assets)} assets in department {department_name}")
-        
-        processed_data = []
-        for asset in assets:
-            asset_info = {
-                'Asset ID': asset.get('display_id'),
-                'Name': asset.get('name'),
-                'Location': self.asset_manager._get_location_name(asset),
-                'Type': self.asset_manager._get_asset_type(asset),
-                'State': asset.get('asset_state')
-            }
-            logger.debug(f"Processed asset: {asset_info}")
-            processed_data.append(asset_info)
-
-        if output_file:
-            logger.info(f"Exporting results to {output_file}")
-            self.search_manager.export_results(assets, output_file)
-            
+        logger.info(f"Found {len(processed_data)} assets in department {department_name}")
         return processed_data, f"Assets found in department: {department_name}"
 
     def search_by_location(self, location_name, output_file=None):
@@ -154,24 +228,57 @@ class FreshServiceManager:
         if not loc_id:
             return None, "Location not found"
             
-        assets = self.asset_manager.get_assets_by_location(loc_id)
-        if not assets:
+        processed_data = self._collect_search_results(
+            self.asset_manager.iter_assets_by_location(loc_id),
+            ('Department', 'Type'),
+            output_file
+        )
+        if not processed_data:
             return None, "No assets found in this location"
             
+        return processed_data, f"Assets found in location: {location_name}"
+
+    # Columna de resultado -> (colección de referencia, campo del asset)
+    SEARCH_LOOKUPS = {
+        'Department': ('departments', 'department_id'),
+        'Location': ('locations', 'location_id'),
+        'Type': ('asset_types', 'asset_type_id')
+    }
+
+    def _collect_search_results(self, assets, columns, output_file=None):
+        """Build search rows as asset pages arrive, sorted by display_id, resolving the named columns in one batch"""
+        lookups = [self.SEARCH_LOOKUPS[column] for column in columns]
+        ids_by_collection = {collection: set() for collection, _ in lookups}
         processed_data = []
+        # Solo se conservan los assets completos si hay que exportarlos
+        exported_assets = [] if output_file else None
+
         for asset in assets:
-            processed_data.append({
-                'Asset ID': asset.get('display_id'),
-                'Name': asset.get('name'),
-                'Department': self.asset_manager._get_department_name(asset),
-                'Type': self.asset_manager._get_asset_type(asset),
-                'State': asset.get('asset_state')
-            })
-
-        if output_file:
-            self.search_manager.export_results(assets, output_file)
-            
-        return processed_data, f"Assets found in location: {location_name}"
+            row = {'Asset ID': asset.get('display_id'), 'Name': asset.get('name')}
+            # De momento el ID: los nombres se cruzan al final
+            for column, (collection, field) in zip(columns, lookups):
+                row[column] = asset.get(field)
+                if row[column] is not None:
+                    ids_by_collection[collection].add(row[column])
+            row['State'] = asset.get('asset_state')
+            processed_data.append(row)
+            if exported_assets is not None:
+                exported_assets.append(asset)
+
+        # Los IDs distintos se resuelven de una vez y luego se cruzan en memoria
+        names = self.asset_manager.resolve_reference_names(ids_by_collection) if processed_data else {}
+        for row in processed_data:
+            for column, (collection, _) in zip(columns, lookups):
+                row[column] = names[collection].get(row[column], 'Unknown')
+            logger.debug(f"Processed asset: {row}")
+        processed_data.sort(key=lambda row: int(row.get('Asset ID') or 0))
+
+        if exported_assets:
+            logger.info(f"Exporting results to {output_file}")
+            exported_assets.sort(key=lambda asset: int(asset.get('display_id') or 0))
+            self.search_manager.export_results(exported_assets, output_file)
+
+        return processed_data
 
     def import_excel_ids(self, excel_file):
         """Import IDs from Excel and export to txt"""
@@ -189,12 +296,15 @@ class FreshServiceManager:
             # Create output filename
             output_file = os.path.splitext(excel_file)[0] + '_ids.txt'
             
-            # Export IDs to txt file
+            # Export IDs to txt file (lista separada por comas, escrita rango a rango)
             with open(output_file, 'w') as f:
-                f.write(','.join(map(str, ids)))
+                separator = ''
+                for start, end in ids.ranges:
+                    f.write(separator + ','.join(map(str, range(start, end + 1))))
+                    separator = ','
 
             print(f"{Fore.GREEN}Successfully exported {len(ids)} IDs to {output_file}")
-            print(f"{Fore.CYAN}IDs: {','.join(map(str, ids[:5])) + ('...' if len(ids) > 5 else '')}")
+            print(f"{Fore.CYAN}IDs: {','.join(map(str, ids.head(5))) + ('...' if len(ids) > 5 else '')}")
 
         except Exception as e:
             print(f"{Fore.RED}Error processing Excel file: {str(e)}")
@@ -233,11 +343,7 @@ class FreshServiceManager:
         if not asset_ids:
             return None
 
-        data = []
-        for asset_id in asset_ids:
-            asset_data = self.asset_manager.process_asset(asset_id, options)
-            if asset_data:
-                data.append(asset_data)
+        data = self.asset_manager.process_assets(asset_ids, options)
 
         return data if data else None
 
@@ -0,0 +1,173 @@
+import bisect
+import re
+from itertools import islice
+
+# Separadores aceptados entre IDs: comas, punto y coma y saltos de línea
+TOKEN_SEPARATORS = re.compile(r'[,;\r\n]+')
+
+def iter_id_tokens(file, chunk_size=65536):
+    """Yield the ID/range tokens of a text stream without reading it whole"""
+    remainder = ''
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            break
+        parts = TOKEN_SEPARATORS.split(remainder + chunk)
+        # El último trozo puede estar cortado a mitad de un ID
+        remainder = parts.pop()
+        for part in parts:
+            if part.strip():
+                yield part
+    if remainder.strip():
+        yield remainder
+
+def split_id_tokens(text):
+    """Get the ID/range tokens of a string ('143-150,155,160')"""
+    return [part for part in TOKEN_SEPARATORS.split(text or '') if part.strip()]
+
+class IdRangeSet:
+    """Immutable set of integer IDs stored as sorted, merged inclusive ranges"""
+
+    # Cada cuántos rangos pendientes se fusionan al construir desde muchos IDs sueltos
+    COMPACT_EVERY = 100000
+
+    def __init__(self, ranges=()):
+        self._ranges = self._normalize(ranges)
+        self._count = sum(end - start + 1 for start, end in self._ranges)
+
+    @staticmethod
+    def _normalize(ranges):
+        """Sort ranges and merge the overlapping or adjacent ones"""
+        merged = []
+        for start, end in sorted(ranges):
+            if start > end:
+                continue
+            if merged and start <= merged[-1][1] + 1:
+                if end > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+        return merged
+
+    @classmethod
+    def from_ids(cls, ids):
+        """Build a set from individual IDs"""
+        return cls.from_ranges((id_, id_) for id_ in ids)
+
+    @classmethod
+    def from_ranges(cls, ranges):
+        """Build a set from (start, end) pairs, compacting as they arrive"""
+        pending = []
+        threshold = cls.COMPACT_EVERY
+        for id_range in ranges:
+            pending.append(id_range)
+            if len(pending) >= threshold:
+                pending = cls._normalize(pending)
+                # Si quedan muchos rangos disjuntos, el umbral crece: coste amortizado lineal
+                threshold = max(cls.COMPACT_EVERY, 2 * len(pending))
+        return cls(pending)
+
+    @classmethod
+    def from_tokens(cls, tokens, invalid=None):
+        """Build a set from tokens like '143', '150.0' (Excel) or '143-150'; bad tokens go to `invalid`"""
+        def parse():
+            for token in tokens:
+                id_range = cls.parse_token(token)
+                if id_range is None:
+                    if invalid is not None:
+                        invalid.append(token.strip())
+                    continue
+                yield id_range
+        return cls.from_ranges(parse())
+
+    @classmethod
+    def parse(cls, text, invalid=None):
+        """Build a set from a string such as '1-2000000,2500000'"""
+        return cls.from_tokens(split_id_tokens(text), invalid)
+
+    @staticmethod
+    def parse_token(token):
+        """Get the (start, end) range of one token or None if it is not valid"""
+        token = str(token).strip()
+        if '-' in token:
+            try:
+                start, end = map(int, token.split('-'))
+            except ValueError:
+                return None
+            return start, end
+        if token.endswith('.0'):
+            token = token[:-2]
+        if token.isdigit():
+            return int(token), int(token)
+        return None
+
+    @property
+    def ranges(self):
+        """Get the merged (start, end) ranges"""
+        return list(self._ranges)
+
+    @property
+    def last(self):
+        """Get the highest ID or None if the set is empty"""
+        return self._ranges[-1][1] if self._ranges else None
+
+    def __or__(self, other):
+        return IdRangeSet(self._ranges + other._ranges)
+
+    union = __or__
+
+    def __sub__(self, other):
+        # Barrido en paralelo de ambas listas de rangos: O(n + m)
+        result = []
+        others = other._ranges
+        first = 0
+        for start, end in self._ranges:
+            while first < len(others) and others[first][1] < start:
+                first += 1
+            current = start
+            index = first
+            while index < len(others) and others[index][0] <= end:
+                other_start, other_end = others[index]
+                if other_start > current:
+                    result.append((current, other_start - 1))
+                current = max(current, other_end + 1)
+                if other_end > end:
+                    break
+                index += 1
+            if current <= end:
+                result.append((current, end))
+        return IdRangeSet(result)
+
+    subtract = __sub__
+
+    def __and__(self, other):
+        return self - (self - other)
+
+    intersection = __and__
+
+    def __contains__(self, value):
+        index = bisect.bisect_right(self._ranges, (value, float('inf'))) - 1
+        return index >= 0 and self._ranges[index][0] <= value <= self._ranges[index][1]
+
+    def __iter__(self):
+        for start, end in self._ranges:
+            yield from range(start, end + 1)
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return bool(self._ranges)
+
+    def __eq__(self, other):
+        return isinstance(other, IdRangeSet) and self._ranges == other._ranges
+
+    def head(self, count):
+        """Get the first IDs (for previews)"""
+        return list(islice(self, count))
+
+    def __str__(self):
+        return ','.join(str(start) if start == end else f'{start}-{end}' for start, end in self._ranges)
+
+    def __repr__(self):
+        return f"IdRangeSet('{self}')"
@@ -0,0 +1,62 @@
+import threading
+from collections import defaultdict
+
+# Campo del resultado afectado por cada tipo de endpoint
+FIELD_BY_ENDPOINT = {
+    'assets': 'asset',
+    'components': 'components',
+    'requesters': 'user',
+    'departments': 'department',
+    'locations': 'location',
+    'asset_types': 'asset_type'
+}
+
+class OfflineReport:
+    """Per-field count of the data that was missing or stale while running offline"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.fields = defaultdict(lambda: {'served': 0, 'stale': 0, 'missing': 0})
+            self.missing_keys = defaultdict(set)
+
+    @staticmethod
+    def get_field(endpoint):
+        """Map an endpoint (assets/5/components, requesters/7, ...) to the result field it feeds"""
+        path = endpoint.split('?')[0].strip('/')
+        if path.endswith('/components'):
+            return 'components'
+        resource = path.split('/')[0]
+        return FIELD_BY_ENDPOINT.get(resource, resource or 'general')
+
+    def record(self, endpoint, status):
+        """Record a lookup answered offline: status is 'served', 'stale' or 'missing'"""
+        field = self.get_field(endpoint)
+        with self._lock:
+            self.fields[field][status] += 1
+            if status == 'missing':
+                self.missing_keys[field].add(endpoint.split('?')[0])
+
+    def has_issues(self):
+        with self._lock:
+            return any(counts['stale'] or counts['missing'] for counts in self.fields.values())
+
+    def summary(self):
+        """Get one line per field with missing or stale data"""
+        with self._lock:
+            lines = []
+            for field, counts in sorted(self.fields.items()):
+                if counts['stale'] or counts['missing']:
+                    lines.append(f"{field}: {counts['missing']} missing, {counts['stale']} stale "
+                                 f"({counts['served']} served)")
+            return lines
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                field: {**counts, 'missing_keys': sorted(self.missing_keys[field])[:20]}
+                for field, counts in self.fields.items()
+            }
@@ -0,0 +1,71 @@
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+class _Failure:
+    """Exception raised by a stage, forwarded to the consumer"""
+
+    def __init__(self, error):
+        self.error = error
+
+def iter_pipeline(items, stages, depth=4, name='pipeline'):
+    """Run each stage in its own thread, connected by bounded queues, and yield the results in input order"""
+    stop = threading.Event()
+    queues = [queue.Queue(maxsize=max(1, depth)) for _ in stages]
+
+    def put(target, item):
+        # Espera acotada para poder abandonar si el consumidor deja de leer
+        while not stop.is_set():
+            try:
+                target.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(source):
+        while not stop.is_set():
+            try:
+                return source.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def run_stage(index, stage):
+        output = queues[index]
+        try:
+            source = iter(items) if index == 0 else iter(lambda: get(queues[index - 1]), _DONE)
+            for item in source:
+                if isinstance(item, _Failure):
+                    put(output, item)
+                    break
+                if not put(output, stage(item)):
+                    return
+        except Exception as e:
+            logger.error(f"Pipeline stage {name}-{index} failed: {e}")
+            put(output, _Failure(e))
+        finally:
+            put(output, _DONE)
+
+    threads = [
+        threading.Thread(target=run_stage, args=(index, stage), name=f'{name}-{index}', daemon=True)
+        for index, stage in enumerate(stages)
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        while True:
+            item = get(queues[-1])
+            if item is _DONE:
+                break
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=5)
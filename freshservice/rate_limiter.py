@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+from .config import RATE_LIMIT_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(key):
+    """Get the process-wide rate limiter for an API key"""
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = RateLimiter()
+        return _limiters[key]
+
+class RateLimiter:
+    """Token bucket paced by the X-Ratelimit-* headers returned by Freshservice"""
+
+    def __init__(self, config=None):
+        self.config = {**RATE_LIMIT_CONFIG, **(config or {})}
+        self.window = self.config['window_seconds']
+        self.capacity = self.config['requests_per_minute']
+        self.refill_rate = self.capacity / self.window
+        self.tokens = float(self.capacity)
+        self.server_total = None
+        self.server_remaining = None
+        self.paused_until = 0.0
+        self._last_refill = time.monotonic()
+        self._cond = threading.Condition()
+        self.stats = {
+            'requests': 0,
+            'throttled_waits': 0,
+            'throttled_seconds': 0.0,
+            'rate_limit_hits': 0
+        }
+
+    def _refill(self, now):
+        """Add the tokens earned since the last refill"""
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+            self._last_refill = now
+
+    def _take_token(self, waited):
+        """Take a token if available; return 0 on success or the seconds to wait (lock held)"""
+        now = time.monotonic()
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.stats['requests'] += 1
+            if waited:
+                self.stats['throttled_waits'] += 1
+                self.stats['throttled_seconds'] += waited
+            return 0
+        return (1 - self.tokens) / self.refill_rate
+
+    def acquire(self):
+        """Block until a request can be sent without exceeding the budget"""
+        waited = 0.0
+        with self._cond:
+            while True:
+                wait = self._take_token(waited)
+                if not wait:
+                    return waited
+
+                # wait() libera el lock para que el resto de hilos pueda consultar el presupuesto
+                start = time.monotonic()
+                self._cond.wait(wait)
+                waited += time.monotonic() - start
+
+    def try_acquire(self, waited=0.0):
+        """Non-blocking acquire for asyncio callers: 0 if a token was taken, else seconds to wait"""
+        with self._cond:
+            return self._take_token(waited)
+
+    def update_from_response(self, response):
+        """Sync the bucket with the X-Ratelimit-Total/Remaining headers"""
+        headers = response.headers
+        total = self._parse_int(headers.get('X-Ratelimit-Total'))
+        remaining = self._parse_int(headers.get('X-Ratelimit-Remaining'))
+
+        with self._cond:
+            if total:
+                self.server_total = total
+                if total != self.capacity:
+                    logger.info(f"Rate limit capacity updated from headers: {total} requests/{self.window}s")
+                    self.capacity = total
+                    self.refill_rate = total / self.window
+            if remaining is not None:
+                self.server_remaining = remaining
+                # Nunca gastar más de lo que el servidor dice que queda (menos un margen)
+                self.tokens = min(self.tokens, max(remaining - self.config['safety_margin'], 0))
+
+    def pause(self, seconds):
+        """Pause every thread until the given number of seconds has passed"""
+        with self._cond:
+            now = time.monotonic()
+            # Varios hilos pueden recibir el mismo 429: solo cuenta como una pausa
+            is_new_pause = now >= self.paused_until
+            self.paused_until = max(self.paused_until, now + seconds)
+            if is_new_pause:
+                self.tokens = 0
+                self.stats['rate_limit_hits'] += 1
+            self._cond.notify_all()
+        return is_new_pause
+
+    def get_budget(self):
+        """Get the current request budget"""
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                'capacity': self.capacity,
+                'available': int(self.tokens),
+                'server_total': self.server_total,
+                'server_remaining': self.server_remaining,
+                'paused_for': max(self.paused_until - now, 0.0),
+                **self.stats
+            }
+
+    @staticmethod
+    def _parse_int(value):
+        try:
+            return int(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
@@ -0,0 +1,217 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from .config import CACHE_CONFIG, REFERENCE_DATA_CONFIG
+from .search_index import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+class ReferenceDataRegistry:
+    """In-memory indexes of departments, locations, asset types and requesters loaded once per run"""
+
+    COLLECTIONS = ('departments', 'locations', 'asset_types', 'requesters')
+
+    # Campos indexados para la búsqueda por nombre
+    SEARCH_FIELDS = {
+        'departments': ('name',),
+        'locations': ('name',),
+        'requesters': ('first_name', 'last_name')
+    }
+
+    def __init__(self, api):
+        self.api = api
+        self._indexes = {name: {} for name in self.COLLECTIONS}
+        self._loaded_at = {}
+        self._checked_at = {}
+        self._lock = threading.Lock()
+        self._load_locks = {name: threading.Lock() for name in self.COLLECTIONS}
+        self._search_indexes = {name: SearchIndex(fields) for name, fields in self.SEARCH_FIELDS.items()}
+        self._indexed_at = {}
+
+    def preload(self, collections=None, force=False):
+        """Load the given collections in parallel if missing or older than max_age_seconds"""
+        collections = collections or self.COLLECTIONS
+        names = [name for name in collections if force or name not in self._loaded_at]
+        # Las colecciones ya cargadas pero caducadas no bloquean el inicio de la ejecución
+        for name in collections:
+            if name not in names:
+                self._ensure_loaded(name)
+        if not names:
+            return
+
+        logger.info(f"Preloading reference data: {names}")
+        with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix='reference-data') as executor:
+            list(executor.map(self._load, names))
+
+    def _is_stale(self, name):
+        loaded_at = self._loaded_at.get(name)
+        return loaded_at is None or time.time() - loaded_at > REFERENCE_DATA_CONFIG['max_age_seconds']
+
+    def _ensure_loaded(self, name):
+        """Load a missing collection; reload a stale one in the background when stale_while_revalidate is on"""
+        if name not in self._loaded_at:
+            self._load(name)
+        # Una instantánea antigua se usa ya y se refresca en cuanto se carga
+        if self._is_stale(name):
+            if CACHE_CONFIG.get('stale_while_revalidate'):
+                if not self._load_locks[name].locked():
+                    threading.Thread(target=self._load, args=(name,), name=f'reference-refresh-{name}', daemon=True).start()
+            else:
+                self._load(name)
+
+    def _load(self, name, min_interval=0):
+        """(Re)load a collection; concurrent callers wait for a single download"""
+        requested_at = time.time()
+        with self._load_locks[name]:
+            # Otro hilo ya lo recargó mientras esperábamos, o los datos son muy recientes
+            if self._checked_at.get(name, 0) >= requested_at:
+                return False
+            loaded_at = self._loaded_at.get(name)
+            if loaded_at is not None and requested_at - loaded_at < min_interval:
+                return False
+
+            records, fetched_at = self._fetch_records(name)
+            self._checked_at[name] = time.time()
+            if not records and self._indexes[name]:
+                # Fallo de red o respuesta vacía: conservar el índice anterior
+                logger.warning(f"Reload of {name} returned no records, keeping {len(self._indexes[name])} cached")
+                return False
+            index = {record['id']: record for record in records or [] if 'id' in record}
+            with self._lock:
+                self._indexes[name] = index
+                self._loaded_at[name] = fetched_at
+            logger.info(f"Loaded {len(index)} {name}")
+            return True
+
+    def _fetch_records(self, name):
+        """Get a collection and when it was fetched: cached snapshot first, then only the changes when possible"""
+        if self.api.offline:
+            # fetch_paginated_data sirve la instantánea {name}/all en modo offline
+            return self.api.fetch_paginated_data(name), time.time()
+
+        if name not in self._loaded_at:
+            # Primera carga del proceso: partir de la instantánea si sigue dentro de la ventana de la caché
+            entry = self.api.cache.lookup(f'{name}/all', cache_type=name)
+            if entry is not None and entry['data']:
+                logger.info(f"Loaded {name} from cached snapshot ({'fresh' if entry['fresh'] else 'stale'})")
+                return entry['data'], entry['fetched_at']
+        elif self._can_fetch_changes(name):
+            return self._fetch_changes(name), time.time()
+
+        fetched_at = time.time()
+        # fetch_paginated_data guarda la instantánea {name}/all de los listados sin filtro
+        records = self.api.fetch_paginated_data(name)
+        if records:
+            self.api.cache.set(f'{name}/full_sync', {'at': fetched_at}, cache_type=name)
+        return records, fetched_at
+
+    def _can_fetch_changes(self, name):
+        """Whether a reload can fetch only the recent changes instead of the whole collection"""
+        if name not in REFERENCE_DATA_CONFIG.get('delta_queries', {}) or not self._indexes[name]:
+            return False
+        # Las bajas no aparecen en los cambios: descarga completa cada full_reload_hours
+        full_sync = self.api.cache.get(
+            f'{name}/full_sync', cache_type=name, max_age_hours=REFERENCE_DATA_CONFIG['full_reload_hours']
+        )
+        return full_sync is not None
+
+    def _fetch_changes(self, name):
+        """Merge the records updated since the last load into the current ones and refresh the snapshot"""
+        # Margen de un día: el filtro de la API solo tiene precisión de fecha
+        since = datetime.fromtimestamp(self._loaded_at[name] - 86400, timezone.utc).strftime('%Y-%m-%d')
+        query = REFERENCE_DATA_CONFIG['delta_queries'][name].format(since=since)
+        changes = self.api.fetch_paginated_data(name, f'?query="{query}"')
+
+        records = dict(self._indexes[name])
+        records.update({record['id']: record for record in changes if 'id' in record})
+        records = list(records.values())
+        self.api.cache.set(f'{name}/all', records, cache_type=name)
+        logger.info(f"Merged {len(changes)} changed {name} since {since}")
+        return records
+
+    def get(self, name, record_id):
+        """Get a record by ID, refreshing the collection when the ID is missing"""
+        if record_id is None:
+            return None
+        if name not in self._loaded_at:
+            self._load(name)
+
+        record = self._indexes[name].get(record_id)
+        if record is None:
+            # ID desconocido: recargar como mucho una vez cada refresh_min_interval segundos
+            if self._load(name, min_interval=REFERENCE_DATA_CONFIG['refresh_min_interval']):
+                logger.info(f"Refreshed {name} after missing ID {record_id}")
+            record = self._indexes[name].get(record_id)
+        return record
+
+    def resolve(self, ids_by_collection, default='Unknown'):
+        """Resolve many IDs at once: {collection: ids} -> {collection: {id: name}}"""
+        self.preload(list(ids_by_collection))
+        missing = [
+            name for name, ids in ids_by_collection.items()
+            if any(record_id is not None and record_id not in self._indexes[name] for record_id in ids)
+        ]
+        if missing:
+            # IDs desconocidos: una sola recarga por colección, todas en paralelo
+            logger.info(f"Refreshing {missing} for unknown IDs")
+            with ThreadPoolExecutor(max_workers=len(missing), thread_name_prefix='reference-data') as executor:
+                list(executor.map(
+                    lambda name: self._load(name, min_interval=REFERENCE_DATA_CONFIG['refresh_min_interval']), missing
+                ))
+
+        resolved = {}
+        for name, ids in ids_by_collection.items():
+            index = self._indexes[name]
+            resolved[name] = {
+                record_id: index[record_id].get('name', default) if record_id in index else default
+                for record_id in ids
+            }
+        return resolved
+
+    def get_name(self, name, record_id, default='Unknown'):
+        """Get the name of a record by ID"""
+        record = self.get(name, record_id)
+        return record.get('name', default) if record else default
+
+    def get_names(self, name):
+        """Get an {id: name} mapping of a collection"""
+        self._ensure_loaded(name)
+        return {record_id: record.get('name') for record_id, record in self._indexes[name].items()}
+
+    def has_records(self, name):
+        """Whether a collection is loaded and not empty"""
+        self._ensure_loaded(name)
+        return bool(self._indexes[name])
+
+    def _get_search_index(self, name):
+        self._ensure_loaded(name)
+        index = self._search_indexes[name]
+        with self._lock:
+            loaded_at = self._loaded_at.get(name)
+            records = list(self._indexes[name].values())
+        # Tras cada recarga se reindexan solo los registros nuevos, cambiados o eliminados
+        if self._indexed_at.get(name) != loaded_at:
+            changed = index.update(records)
+            self._indexed_at[name] = loaded_at
+            logger.info(f"Search index for {name} updated ({changed} changes, {len(index)} records)")
+        return index
+
+    def search(self, name, query, limit=10):
+        """Search a collection by name (prefix, fuzzy and accent-insensitive), best matches first"""
+        return self._get_search_index(name).search(query, limit)
+
+    def find(self, name, query, max_candidates=5):
+        """Find one record by name: (record, []) if unambiguous, (None, candidates) if several match"""
+        record, candidates = self._get_search_index(name).find(query, max_candidates)
+        if record is None and not candidates:
+            # Puede ser un alta reciente: recargar como mucho una vez cada refresh_min_interval segundos
+            if self._load(name, min_interval=REFERENCE_DATA_CONFIG['refresh_min_interval']):
+                record, candidates = self._get_search_index(name).find(query, max_candidates)
+        return record, candidates
+
+    def get_records(self, name):
+        """Get all records of a collection"""
+        self._ensure_loaded(name)
+        return list(self._indexes[name].values())
@@ -0,0 +1,56 @@
+import json
+import os
+import tempfile
+
+class RowSpool:
+    """Temporary NDJSON copy of a row stream that records every column (and its value types) on the way"""
+
+    def __init__(self, directory=None, track_types=False):
+        # Junto al fichero de salida: el volcado ocupa lo mismo que la exportación
+        self._file = tempfile.TemporaryFile('w+', encoding='utf-8', dir=directory or None)
+        self.track_types = track_types
+        self.columns = {}
+        self.count = 0
+
+    @classmethod
+    def for_output(cls, output_file, track_types=False):
+        return cls(os.path.dirname(os.path.abspath(output_file)), track_types)
+
+    def write(self, row):
+        columns = self.columns
+        if self.track_types:
+            for key, value in row.items():
+                types = columns.setdefault(key, set())
+                if value is not None:
+                    types.add(type(value))
+        else:
+            for key in row:
+                if key not in columns:
+                    columns[key] = None
+        self._file.write(json.dumps(row, default=str, ensure_ascii=False) + '\n')
+        self.count += 1
+
+    def write_all(self, rows):
+        for row in rows:
+            self.write(row)
+        return self
+
+    def get_columns(self):
+        """Get every column seen, in order of first appearance"""
+        return list(self.columns)
+
+    def __iter__(self):
+        self._file.flush()
+        self._file.seek(0)
+        for line in self._file:
+            yield json.loads(line)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,155 @@
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from .config import RUN_JOURNAL_CONFIG
+from .id_set import IdRangeSet
+
+logger = logging.getLogger(__name__)
+
+class RunJournal:
+    """Append-only JSONL checkpoint of a run: a header line, one line per processed asset and an end marker"""
+
+    # Estado de cada asset: los 'failed' (red, 429 agotados, excepciones) se reintentan al reanudar
+    DONE = 'done'
+    NOT_FOUND = 'not_found'
+    FAILED = 'failed'
+    FINISHED_STATUSES = (DONE, NOT_FOUND)
+
+    def __init__(self, path, run_id, options, finished_ids=None, completed=False, failed_ids=None):
+        self.path = path
+        self.run_id = run_id
+        self.options = options
+        self.finished_ids = finished_ids or IdRangeSet()
+        self.failed_ids = failed_ids or IdRangeSet()
+        self.completed = completed
+        self.failed_count = 0
+        self._file = None
+        self._unsynced = 0
+        self._needs_newline = False
+        self._header = None
+
+    @staticmethod
+    def get_directory():
+        from . import CACHE_DIR
+        directory = os.path.join(CACHE_DIR, RUN_JOURNAL_CONFIG['directory'])
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    @classmethod
+    def get_path(cls, run_id):
+        return os.path.join(cls.get_directory(), f'{run_id}.jsonl')
+
+    @classmethod
+    def prune(cls):
+        """Delete the journals older than max_age_days and all but the newest max_runs"""
+        directory = cls.get_directory()
+        journals = []
+        for name in os.listdir(directory):
+            if name.endswith('.jsonl'):
+                path = os.path.join(directory, name)
+                journals.append((os.path.getmtime(path), path))
+        journals.sort(reverse=True)
+
+        oldest = time.time() - RUN_JOURNAL_CONFIG['max_age_days'] * 86400
+        removed = 0
+        for position, (modified_at, path) in enumerate(journals):
+            if position >= RUN_JOURNAL_CONFIG['max_runs'] or modified_at < oldest:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError as e:
+                    logger.warning(f"Could not remove old run journal {path}: {e}")
+        if removed:
+            logger.info(f"Pruned {removed} old run journals")
+
+    @classmethod
+    def create(cls, options):
+        """Start the journal of a new run, pruning the old ones"""
+        cls.prune()
+        run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        journal = cls(cls.get_path(run_id), run_id, dict(options))
+        # La cabecera se escribe con el primer asset: una ejecución sin IDs válidos no deja fichero
+        journal._header = {'type': 'run', 'run_id': run_id, 'options': journal.options, 'started_at': time.time()}
+        return journal
+
+    @classmethod
+    def load(cls, run_id):
+        """Open the journal of a previous run to resume it; raises FileNotFoundError if it doesn't exist"""
+        path = cls.get_path(run_id)
+        options = None
+        completed = False
+        # Último estado de cada ID: un 'failed' reintentado con éxito al reanudar pasa a terminado
+        statuses = {}
+        line = ''
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Última línea a medias si el proceso murió escribiéndola
+                    logger.warning(f"Ignoring truncated line in run journal {run_id}")
+                    continue
+                if entry['type'] == 'run':
+                    options = entry['options']
+                elif entry['type'] == 'asset':
+                    statuses[entry['id']] = entry.get('status') or (cls.DONE if entry['data'] else cls.FAILED)
+                elif entry['type'] == 'done':
+                    completed = True
+        if options is None:
+            raise ValueError(f"Run journal {run_id} has no header")
+        finished = IdRangeSet.from_ids(asset_id for asset_id, status in statuses.items() if status in cls.FINISHED_STATUSES)
+        failed = IdRangeSet.from_ids(asset_id for asset_id, status in statuses.items() if status == cls.FAILED)
+        journal = cls(path, run_id, options, finished, completed, failed)
+        journal._needs_newline = bool(line) and not line.endswith('\n')
+        return journal
+
+    def _append(self, entry):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+            if self._needs_newline:
+                self._file.write('\n')
+                self._needs_newline = False
+            if self._header is not None:
+                self._file.write(json.dumps(self._header, default=str) + '\n')
+                self._header = None
+        self._file.write(json.dumps(entry, default=str) + '\n')
+        self._file.flush()
+        self._unsynced += 1
+        if self._unsynced >= RUN_JOURNAL_CONFIG['fsync_every']:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def record(self, asset_id, data, status=DONE):
+        """Checkpoint a processed asset with its status (done, not_found or failed)"""
+        if status == self.FAILED:
+            self.failed_count += 1
+        self._append({'type': 'asset', 'id': asset_id, 'status': status, 'data': data})
+
+    def mark_completed(self, output=None):
+        self._append({'type': 'done', 'output': output, 'finished_at': time.time()})
+        self.completed = True
+
+    def iter_data(self):
+        """Yield the processed rows in the order they were checkpointed"""
+        if self._file is not None:
+            self._file.flush()
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if entry['type'] == 'asset' and entry['data']:
+                    data = entry['data']
+                    yield from data if isinstance(data, list) else [data]
+
+    def close(self):
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
@@ -0,0 +1,130 @@
+import bisect
+import difflib
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+def normalize_text(text):
+    """Lowercase, strip accents and punctuation: 'José  García' -> 'jose garcia'"""
+    decomposed = unicodedata.normalize('NFKD', str(text or ''))
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(re.sub(r'[^\w]+', ' ', stripped.casefold()).split())
+
+class SearchIndex:
+    """In-memory inverted index with prefix, fuzzy and accent-insensitive matching"""
+
+    # Puntuación por término de la consulta según cómo coincide
+    EXACT_SCORE = 3.0
+    PREFIX_SCORE = 2.0
+    FUZZY_SCORE = 1.0
+    FULL_MATCH_BONUS = 5.0
+    # El mejor resultado se acepta sin ambigüedad si supera al segundo en esta proporción
+    DOMINANCE_RATIO = 1.5
+
+    def __init__(self, fields, fuzzy_cutoff=0.75):
+        self.fields = fields
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._docs = {}
+        self._postings = defaultdict(set)
+        self._vocabulary = []
+        self._lock = threading.Lock()
+
+    def _document_text(self, record):
+        return normalize_text(' '.join(str(record.get(field) or '') for field in self.fields))
+
+    def _signature(self, record):
+        # Si el registro no ha cambiado no hace falta reindexarlo
+        return record.get('updated_at') or self._document_text(record)
+
+    def update(self, records):
+        """Incrementally sync the index with the current records (add, change and remove by id)"""
+        records = {record['id']: record for record in records if 'id' in record}
+        with self._lock:
+            changed = 0
+            for doc_id in [doc_id for doc_id in self._docs if doc_id not in records]:
+                self._remove(doc_id)
+                changed += 1
+            for doc_id, record in records.items():
+                current = self._docs.get(doc_id)
+                if current is None or current['signature'] != self._signature(record):
+                    if current is not None:
+                        self._remove(doc_id)
+                    self._add(doc_id, record)
+                    changed += 1
+            if changed:
+                self._vocabulary = sorted(self._postings)
+            return changed
+
+    def _add(self, doc_id, record):
+        text = self._document_text(record)
+        self._docs[doc_id] = {'record': record, 'text': text, 'signature': self._signature(record)}
+        for token in set(text.split()):
+            self._postings[token].add(doc_id)
+
+    def _remove(self, doc_id):
+        doc = self._docs.pop(doc_id)
+        for token in set(doc['text'].split()):
+            self._postings[token].discard(doc_id)
+            if not self._postings[token]:
+                del self._postings[token]
+
+    def _match_token(self, token):
+        """Get {doc_id: score} for one query token: exact, then prefix, then fuzzy matches"""
+        matches = {}
+        start = bisect.bisect_left(self._vocabulary, token)
+        for term in self._vocabulary[start:]:
+            if not term.startswith(token):
+                break
+            score = self.EXACT_SCORE if term == token else self.PREFIX_SCORE
+            for doc_id in self._postings[term]:
+                matches[doc_id] = max(matches.get(doc_id, 0), score)
+        if matches:
+            return matches
+
+        # Sin coincidencias exactas ni por prefijo: tolerar erratas
+        for term in difflib.get_close_matches(token, self._vocabulary, n=5, cutoff=self.fuzzy_cutoff):
+            score = self.FUZZY_SCORE * difflib.SequenceMatcher(None, token, term).ratio()
+            for doc_id in self._postings[term]:
+                matches[doc_id] = max(matches.get(doc_id, 0), score)
+        return matches
+
+    def _rank(self, query):
+        """Get [(record, score)] of the records matching every term of the query, best first"""
+        normalized = normalize_text(query)
+        tokens = normalized.split()
+        if not tokens:
+            return []
+
+        with self._lock:
+            scores = None
+            for token in tokens:
+                matches = self._match_token(token)
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = {doc_id: score + matches[doc_id] for doc_id, score in scores.items() if doc_id in matches}
+                if not scores:
+                    return []
+
+            for doc_id in scores:
+                if self._docs[doc_id]['text'] == normalized:
+                    scores[doc_id] += self.FULL_MATCH_BONUS
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], str(item[0])))
+            return [(self._docs[doc_id]['record'], score) for doc_id, score in ranked]
+
+    def search(self, query, limit=10):
+        """Get the records matching every term of the query, best first"""
+        return [record for record, _ in self._rank(query)[:limit]]
+
+    def find(self, query, max_candidates=5):
+        """Get (record, []) if the best match is unique or clearly dominant, otherwise (None, best candidates)"""
+        ranked = self._rank(query)
+        if not ranked:
+            return None, []
+        if len(ranked) == 1 or ranked[0][1] >= ranked[1][1] * self.DOMINANCE_RATIO:
+            return ranked[0][0], []
+        return None, [record for record, _ in ranked[:max_candidates]]
+
+    def __len__(self):
+        return len(self._docs)
@@ -0,0 +1,91 @@
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .config import HTTP_CONFIG
+
+logger = logging.getLogger(__name__)
+
+class SessionManager:
+    """Pooled keep-alive HTTP session shared by every manager of a FreshServiceAPI"""
+
+    def __init__(self, auth=None, config=None):
+        self.auth = auth
+        self.config = {**HTTP_CONFIG, **(config or {})}
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """Lazily create the pooled session (thread-safe)"""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    def _create_session(self):
+        """Build a requests.Session with pooled adapters and transport retries"""
+        session = requests.Session()
+        session.auth = self.auth
+        if self.config['keep_alive']:
+            session.headers.update({'Connection': 'keep-alive'})
+
+        # Reintentos a nivel de transporte para errores de red y 5xx.
+        # Los 429 se gestionan en FreshServiceAPI para respetar Retry-After.
+        retry = Retry(
+            total=self.config['transport_retries'],
+            backoff_factor=self.config['backoff_factor'],
+            status_forcelist=self.config['status_forcelist'],
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.config['pool_connections'],
+            pool_maxsize=self.config['pool_maxsize'],
+            pool_block=self.config['pool_block'],
+            max_retries=retry
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+        logger.info(
+            f"HTTP session created (pool_maxsize={self.config['pool_maxsize']}, "
+            f"transport_retries={self.config['transport_retries']})"
+        )
+        return session
+
+    def request(self, method, url, **kwargs):
+        """Send a request through the pooled session"""
+        kwargs.setdefault('timeout', self.config['timeout'])
+        return self.session.request(method, url, **kwargs)
+
+    def get_stats(self):
+        """Report how many requests reused an already open connection"""
+        connections = 0
+        requests_sent = 0
+        if self._session is not None:
+            for adapter in set(self._session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    pool = pools.get(key)
+                    if pool is None:
+                        continue
+                    connections += pool.num_connections
+                    requests_sent += pool.num_requests
+
+        reused = max(requests_sent - connections, 0)
+        return {
+            'requests': requests_sent,
+            'connections_opened': connections,
+            'connections_reused': reused,
+            'reuse_ratio': reused / requests_sent if requests_sent else 0.0
+        }
+
+    def close(self):
+        """Close the session and release pooled connections"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
@@ -2,6 +2,7 @@ import argparse
 import logging
 from colorama import Fore, init, Style
 from freshservice import FreshServiceManager
+from freshservice.config import CONCURRENCY_CONFIG, ASYNC_CONFIG, PIPELINE_CONFIG, EXPORT_CONFIG
 
 logger = logging.getLogger(__name__)
 
@@ -46,16 +47,32 @@ Component Options:
 -dj: Disable RAM joining
 -jc: Combine CPU and RAM info
 
+Performance Options:
+-w: Number of assets processed concurrently
+--async: Use the asyncio engine (optional max requests in flight)
+--read-ahead: Assets prefetched ahead of the one being processed when -w is 1
+--sync: Sync the local asset mirror (full first time, then incremental)
+--full-sync: Force a full mirror sync
+--offline: Answer only from the cache and the local mirror (no network)
+
 File Options:
+--resume: Resume an interrupted run by its run ID
 -ie: Import IDs from Excel
 -o: Export results to file
+--format: Export format (xlsx, csv, json, ndjson, parquet; default from the -o extension)
+--gzip: Compress csv/json/ndjson exports
 -v: Show results in console""",
         epilog=f"""{Fore.YELLOW}Examples:
 1. Get asset info: python fstools.py -i 143-150 -e 145,147 -a -o output.xlsx
 2. Get components: python fstools.py -i 143-150 -c cpu ram -o output.xlsx
 3. Search by user: python fstools.py -su "John Doe" -o user_assets.xlsx
 4. List locations: python fstools.py -ll
-5. Import from Excel: python fstools.py -ie assets.xlsx"""
+5. Import from Excel: python fstools.py -ie assets.xlsx
+6. Concurrent run: python fstools.py -i 1-5000 -a -w 8 -o output.xlsx
+7. Sync local mirror: python fstools.py --sync
+8. Offline report: python fstools.py -i 1-500 -a --offline -o output.xlsx
+9. Resume a run: python fstools.py --resume 20250101_120000_ab12cd
+10. Streaming export: python fstools.py -i 1-50000 -a --format ndjson -o inventory.ndjson"""
     )
     
     parser.add_argument('-i', '--ids',
@@ -66,7 +83,7 @@ File Options:
                       choices=['cpu', 'ram', 'hdd', 'nic'],
                       help='Component types to include (space-separated). Valid options: cpu ram hdd nic')
     parser.add_argument('-o', '--output',
-                      help='Output Excel file path')
+                      help='Output file path (.xlsx by default; .csv, .json, .ndjson or .parquet select the format)')
     parser.add_argument('-v', '--verbose',
                       type=lambda x: x.lower() == 'true',
                       default=True,
@@ -95,6 +112,29 @@ File Options:
                       help='Disable RAM joining')
     parser.add_argument('-jc', '--combine-cpu-ram', action='store_true',
                       help='Combine CPU and RAM info')
+    parser.add_argument('-w', '--workers', type=int,
+                      default=CONCURRENCY_CONFIG['default_workers'],
+                      help=f"Number of assets processed concurrently (default: {CONCURRENCY_CONFIG['default_workers']}, "
+                           f"max: {CONCURRENCY_CONFIG['max_workers']})")
+    parser.add_argument('--async', dest='async_concurrency', nargs='?', type=int,
+                      const=ASYNC_CONFIG['max_concurrency'], default=None,
+                      help=f"Process assets with the asyncio engine (default concurrency: {ASYNC_CONFIG['max_concurrency']})")
+    parser.add_argument('--read-ahead', type=int, default=PIPELINE_CONFIG['read_ahead'],
+                      help=f"Assets prefetched while the current one is processed with -w 1 "
+                           f"(default: {PIPELINE_CONFIG['read_ahead']}, 0 disables the pipeline)")
+    parser.add_argument('--format', choices=EXPORT_CONFIG['allowed_formats'],
+                      help='Export format (default: from the output extension, xlsx otherwise); '
+                           'csv, json, ndjson and parquet are written in streaming')
+    parser.add_argument('--gzip', action='store_true',
+                      help='Compress csv/json/ndjson exports (adds .gz to the output file)')
+    parser.add_argument('--resume', metavar='RUN_ID',
+                      help='Resume an interrupted run: skip the assets already in its journal and export everything')
+    parser.add_argument('--sync', action='store_true',
+                      help='Sync the local asset mirror (incremental by updated_at after the first full pull)')
+    parser.add_argument('--full-sync', action='store_true',
+                      help='Force a full sync of the local asset mirror')
+    parser.add_argument('--offline', action='store_true',
+                      help='Never touch the network: answer from the cache and the local mirror only')
     parser.add_argument('--subdomain',
                       default='gdnt',
                       help='Freshservice subdomain')
@@ -125,7 +165,31 @@ def main():
     logger.debug("Command line arguments: %s", vars(args))
     
     manager = FreshServiceManager()
+    if args.offline:
+        if args.sync or args.full_sync:
+            print(f"{Fore.RED}Error: --sync needs network access and can't be combined with --offline.")
+            return
+        manager.set_offline(True)
+        print(f"{Fore.YELLOW}Offline mode: using cached and mirrored data only")
+
+    try:
+        run_command(manager, args)
+    finally:
+        if args.offline:
+            print_offline_report(manager)
+
+def print_offline_report(manager):
+    """Print which fields had missing or stale data in offline mode"""
+    lines = manager.get_offline_report()
+    if not lines:
+        print(f"{Fore.GREEN}Offline: all requested data was available and fresh")
+        return
+    print(f"{Fore.YELLOW}Offline data report:")
+    for line in lines:
+        print(f"{Fore.YELLOW}  {line}")
 
+def run_command(manager, args):
+    """Run the command selected by the arguments"""
     if args.components:
         logger.info(f"Component search requested for types: {args.components}")
         logger.debug("Validating component types...")
@@ -141,6 +205,10 @@ def main():
             return
         logger.info(f"Component validation successful: {components}")
 
+    if args.sync or args.full_sync:
+        manager.sync_mirror(full=args.full_sync)
+        return
+
     if args.import_excel:
         manager.import_excel_ids(args.import_excel)
         return
@@ -162,9 +230,13 @@ def main():
         manager.search_by_location(args.search_location, args.output)
         return
 
+    if args.workers < 1:
+        print(f"{Fore.RED}Error: -w/--workers must be at least 1.")
+        return
+
     # Verificar si se proporcionó el argumento ids
-    if not args.ids:
-        print(f"{Fore.RED}Error: The -i/--ids argument is required when not using search options.")
+    if not args.ids and not args.resume:
+        print(f"{Fore.RED}Error: The -i/--ids argument is required when not using search or --resume options.")
         return
     
     # Procesar opciones
@@ -184,7 +256,13 @@ def main():
         'include_serial_number': args.serial_number or args.asset_data,
         'include_description': args.description or args.asset_data,
         'verbose': args.verbose,
-        'all_data': args.asset_data
+        'all_data': args.asset_data,
+        'workers': args.workers,
+        'async_concurrency': args.async_concurrency,
+        'read_ahead': args.read_ahead,
+        'resume': args.resume,
+        'format': args.format,
+        'gzip': args.gzip or None
     }
     
     logger.debug("Processing with options: %s", options)
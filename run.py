@@ -1,7 +1,18 @@
 import os
+import argparse
 from web import app, BASE_DIR
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Freshservice tools web app')
+    parser.add_argument('--offline', action='store_true',
+                        help='Answer only from the cache and the local mirror (no network)')
+    args = parser.parse_args()
+    if args.offline:
+        from web.routes import manager
+        app.config['OFFLINE'] = True
+        manager.set_offline(True)
+        print("Offline mode: using cached and mirrored data only")
+
     # Configurar un PIN fijo para el debugger
     os.environ['WERKZEUG_DEBUG_PIN'] = '123-456-789'
     
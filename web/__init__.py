@@ -23,6 +23,8 @@ app.config['ENV'] = 'development'
 app.config['DEBUG'] = True
 app.config['TEMPLATES_AUTO_RELOAD'] = True
 app.config['WTF_CSRF_ENABLED'] = False  # Deshabilitar CSRF completamente
+# Modo offline: responder solo desde la caché y el espejo local (run.py --offline o FRESHSERVICE_OFFLINE=1)
+app.config['OFFLINE'] = os.getenv('FRESHSERVICE_OFFLINE', '').lower() in ('1', 'true', 'yes')
 Bootstrap(app)
 
 # Importar rutas después de crear la aplicación
@@ -1,7 +1,8 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, SelectField, SelectMultipleField, SubmitField, BooleanField, FileField
-from wtforms.validators import DataRequired, Optional, ValidationError
+from wtforms import StringField, SelectField, SelectMultipleField, SubmitField, BooleanField, FileField, IntegerField
+from wtforms.validators import DataRequired, Optional, ValidationError, NumberRange
 import os
+from freshservice.config import CONCURRENCY_CONFIG
 
 # Crear una clase base sin CSRF
 class NoCSRFForm(FlaskForm):
@@ -45,6 +46,10 @@ class AssetForm(NoCSRFForm):
     disable_join = BooleanField('Desactivar unión de RAM')
     combine_cpu_ram = BooleanField('Combinar CPU y RAM')
     all_data = BooleanField('Incluir todos los datos')
+    workers = IntegerField('Procesamiento concurrente',
+                          default=CONCURRENCY_CONFIG['default_workers'],
+                          validators=[Optional(), NumberRange(min=1, max=CONCURRENCY_CONFIG['max_workers'])],
+                          description=f"Número de activos procesados en paralelo (1-{CONCURRENCY_CONFIG['max_workers']})")
     filename = StringField('Nombre del archivo', validators=[Optional()], 
                          description='Nombre para guardar el archivo (opcional)')
     submit = SubmitField('Buscar Activos')
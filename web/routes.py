@@ -24,6 +24,14 @@ os.makedirs(TEMP_RESULTS_DIR, exist_ok=True)
 from freshservice import FreshServiceManager
 
 manager = FreshServiceManager()
+manager.set_offline(app.config['OFFLINE'])
+
+def flash_offline_report():
+    """Warn about missing or stale fields when serving from the cache/mirror only"""
+    if not app.config['OFFLINE']:
+        return
+    for line in manager.get_offline_report():
+        flash(f'Modo offline - datos incompletos o antiguos en {line}', 'warning')
 
 @app.route('/', methods=['GET'])
 def index():
@@ -88,12 +96,14 @@ def search_id():
             'include_serial_number': 'serial_number' in asset_form.include_info.data,
             'include_description': 'description' in asset_form.include_info.data,
             'verbose': True,
-            'all_data': asset_form.all_data.data
+            'all_data': asset_form.all_data.data,
+            'workers': asset_form.workers.data
         }
         
         try:
             # Procesar los resultados primero
             results = manager.run_and_get_results(options)
+            flash_offline_report()
             
             if not results:
                 flash('No se encontraron resultados', 'warning')
@@ -281,79 +291,17 @@ def download_excel():
             logger.info(f"DataFrame preparado: {len(df)} filas, {len(df.columns)} columnas")
             print(f"DataFrame preparado: {len(df)} filas, {len(df.columns)} columnas")
             
-            # Exportar DataFrame a Excel de forma optimizada
+            # Exportar en una sola pasada: cabecera, bandas, paneles y anchos se aplican al escribir
             try:
-                # Método 1: Exportación directa
-                df.to_excel(output_file, index=False, engine='openpyxl')
+                manager.excel_manager.write_dataframe(df, output_file)
                 excel_ok = True
-                logger.info("Exportación directa completada")
+                logger.info("Exportación en streaming completada")
             except Exception as e:
-                logger.warning(f"Exportación directa fallida: {str(e)}")
-                try:
-                    # Método 2: Exportación por lotes
-                    writer = pd.ExcelWriter(output_file, engine='openpyxl')
-                    
-                    # Exportar en lotes de 1000 filas para reducir uso de memoria
-                    batch_size = 1000
-                    for i in range(0, len(df), batch_size):
-                        if i == 0:
-                            df.iloc[i:i+batch_size].to_excel(writer, index=False, sheet_name='Sheet1')
-                        else:
-                            df.iloc[i:i+batch_size].to_excel(writer, index=False, sheet_name=f'Sheet{(i//batch_size)+1}')
-                    
-                    writer.close()
-                    excel_ok = True
-                    logger.info("Exportación por lotes completada")
-                except Exception as batch_error:
-                    logger.error(f"Error en exportación por lotes: {str(batch_error)}")
-                    excel_ok = False
-            
-            # Aplicar formato adicional si se pudo exportar
-            if excel_ok and os.path.exists(output_file) and os.path.getsize(output_file) > 0:
-                try:
-                    from openpyxl import load_workbook
-                    from openpyxl.styles import PatternFill, Font, Alignment
-                    
-                    # Cargar el archivo
-                    wb = load_workbook(output_file)
-                    
-                    # Para cada hoja en el libro
-                    for sheet_name in wb.sheetnames:
-                        ws = wb[sheet_name]
-                        
-                        # Aplicar formato a cabeceras
-                        header_fill = PatternFill(start_color="1F4E78", end_color="1F4E78", fill_type="solid")
-                        header_font = Font(color="FFFFFF", bold=True)
-                        
-                        for cell in ws[1]:
-                            cell.fill = header_fill
-                            cell.font = header_font
-                            cell.alignment = Alignment(horizontal="center", vertical="center")
-                        
-                        # Auto-ajustar ancho de columnas
-                        for col in ws.columns:
-                            max_length = 0
-                            column = col[0].column_letter
-                            
-                            # Limitar la cantidad de filas a verificar para optimizar
-                            row_sample = min(100, ws.max_row)
-                            for i in range(1, row_sample + 1):
-                                cell = col[i-1]
-                                if cell.value:
-                                    max_length = max(max_length, len(str(cell.value)))
-                            
-                            adjusted_width = min(max_length + 2, 40)  # Limitar ancho máximo
-                            ws.column_dimensions[column].width = adjusted_width
-                    
-                    # Guardar el archivo con formato
-                    wb.save(output_file)
-                    logger.info("Formato aplicado correctamente")
-                except Exception as format_error:
-                    logger.warning(f"No se pudo aplicar formato avanzado al Excel: {format_error}")
-                    # Continuar aunque el formateo falle
+                excel_ok = False
+                logger.error(f"Error en la exportación a Excel: {str(e)}")
             
             # Verificar que el archivo existe y tiene tamaño
-            if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
+            if excel_ok and os.path.exists(output_file) and os.path.getsize(output_file) > 0:
                 logger.info(f"Archivo Excel creado correctamente: {os.path.getsize(output_file)} bytes")
                 print(f"Archivo Excel creado correctamente: {os.path.getsize(output_file)} bytes")
                 
@@ -526,7 +474,8 @@ def search_criteria():
                 session['search_criteria_results'] = results
             else:
                 flash(message, 'warning')
-        
+
+        flash_offline_report()
         return render_template('search_criteria.html', 
                             search_form=search_form,
                             results=results)
@@ -545,17 +494,16 @@ def upload():
             file.save(temp_file.name)
             temp_file.close()
             
-            # Leer IDs
+            # Leer IDs (por bloques, admite comas, saltos de línea y rangos)
             try:
-                with open(temp_file.name, 'r') as f:
-                    content = f.read().strip()
+                ids = manager.asset_manager.process_asset_ids(temp_file.name)
                 
                 # Eliminar el archivo temporal
                 os.unlink(temp_file.name)
                 
-                if content:
-                    # Guardar en la sesión
-                    session['uploaded_ids'] = content
+                if ids:
+                    # Guardar en la sesión en forma de rangos compactos
+                    session['uploaded_ids'] = str(ids)
                     flash('IDs cargados correctamente', 'success')
                     return redirect(url_for('search_id'))
                 else: